@@ -1,15 +1,23 @@
 import logging
 import sqlite3
-import pandas as pd
 from typing import List, Dict, Any
 import os
-import json
 import io
 import csv
+import functools
+import hashlib
+import inspect
+import queue
+import re
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from itertools import compress
 from urllib.parse import urlparse
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 # Configure logging
 logging.basicConfig(
@@ -18,7 +26,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Sitemap Crawler Dashboard API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    pool.close_all()
+
+app = FastAPI(title="Sitemap Crawler Dashboard API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -33,124 +46,275 @@ app.add_middleware(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "output", "tfs_crawl.sqlite")
 
+# Rows written per chunk when streaming the FAQ CSV export
+CSV_EXPORT_BATCH_SIZE = 500
+
+# Number of pooled read-only connections shared by the endpoints
+DB_POOL_SIZE = 4
+
+# Seconds a request waits for a free pooled connection before a 503
+DB_POOL_TIMEOUT = 30
+
+# Distinct (endpoint, query params) payloads kept per DB version
+RESPONSE_CACHE_SIZE = 32
+
+# Applied to every pooled connection
+READ_PRAGMAS = [
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+]
+
+# /api/faqs queries; only the columns the dashboard renders
+FAQ_COLUMNS = "id, question_text, answer_text, answer_mode, document_url"
+SQL_FAQS = f"SELECT {FAQ_COLUMNS} FROM faq_items LIMIT ? OFFSET ?"
+SQL_FAQS_SEARCH = f"""
+    SELECT {FAQ_COLUMNS} FROM faq_items
+    WHERE id IN (SELECT rowid FROM faq_fts WHERE faq_fts MATCH ?)
+    LIMIT ? OFFSET ?
+"""
+SQL_FAQS_SEARCH_LIKE = f"""
+    SELECT {FAQ_COLUMNS} FROM faq_items
+    WHERE question_text LIKE ? OR answer_text LIKE ?
+    LIMIT ? OFFSET ?
+"""
+# The trigram tokenizer cannot match search strings shorter than this
+FTS_TRIGRAM_MIN_LENGTH = 3
+
+# Domains containing any of these are flagged by /api/external-stats
+SENSITIVE_DOMAIN_KEYWORDS = ['irs.gov', 'ssn', 'socialsecurity', 'login', 'account']
+SENSITIVE_DOMAIN_RE = re.compile('|'.join(map(re.escape, SENSITIVE_DOMAIN_KEYWORDS)), re.IGNORECASE)
+
+_HTTP_NETLOC_RE = re.compile(r'https?://([^/?#]*)')
+
+@functools.lru_cache(maxsize=100_000)
+def _netloc(url: str) -> str:
+    """Domain of a URL; registered as the SQLite scalar function netloc()."""
+    if not url:
+        return ""
+    # Fast path for plain http(s) URLs; anything urlparse would treat
+    # specially (IPv6 brackets, tabs/newlines, non-ASCII) takes the slow path
+    match = _HTTP_NETLOC_RE.match(url)
+    if match:
+        netloc = match.group(1)
+        if netloc.isascii() and not any(c in netloc for c in '[]\t\r\n'):
+            return netloc
+    try:
+        return urlparse(url).netloc
+    except ValueError:
+        return ""
+
 def get_db_connection():
     if not os.path.exists(DB_PATH):
         logger.error(f"Database file not found at {DB_PATH}")
         raise HTTPException(status_code=404, detail="Database file not found")
     
-    conn = sqlite3.connect(DB_PATH)
+    # The dashboard only reads; the crawler owns writes (and the WAL journal mode)
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    conn.create_function("netloc", 1, _netloc, deterministic=True)
     return conn
 
-@app.get("/api/stats")
-async def get_stats():
-    conn = get_db_connection()
+class ConnectionPool:
+    """
+    Fixed-size pool of read-only connections reused across requests,
+    so each request keeps a warm page cache instead of reopening the DB.
+    Connections are opened lazily since the DB may not exist at startup.
+    """
+    def __init__(self, size: int, timeout: float):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                conn = get_db_connection()
+                self._opened += 1
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            # Fail the request rather than park a threadpool worker forever
+            logger.error(f"No database connection free after {self.timeout}s")
+            raise HTTPException(status_code=503, detail="Database busy, try again later")
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+pool = ConnectionPool(DB_POOL_SIZE, DB_POOL_TIMEOUT)
+
+def get_conn():
+    """FastAPI dependency that lends a pooled connection for one request."""
+    conn = pool.acquire()
     try:
-        # Total Pages
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents")
-        total_pages = cursor.fetchone()['count']
-        
-        # FAQs
-        cursor = conn.execute("SELECT COUNT(*) as count FROM faq_items")
-        total_faqs = cursor.fetchone()['count']
-        
-        # External Links
-        cursor = conn.execute("SELECT COUNT(*) as count FROM link_edges WHERE is_external=1")
-        total_external_links = cursor.fetchone()['count']
-        
-        # Status Distribution
-        cursor = conn.execute("SELECT status, COUNT(*) as count FROM documents GROUP BY status")
-        status_distribution = [{"name": row['status'], "value": row['count']} for row in cursor.fetchall()]
-        
-        # Answer Modes
-        cursor = conn.execute("SELECT answer_mode, COUNT(*) as count FROM faq_items GROUP BY answer_mode")
-        answer_modes = [{"name": row['answer_mode'], "value": row['count']} for row in cursor.fetchall()]
-        
-        return {
-            "overview": {
-                "totalPages": total_pages,
-                "totalFaqs": total_faqs,
-                "totalExternalLinks": total_external_links
-            },
-            "statusDistribution": status_distribution,
-            "answerModes": answer_modes
-        }
+        yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+def _db_version() -> tuple:
+    """
+    Identifies the current DB contents. The WAL file is included because
+    committed writes land there and leave the main file untouched until a checkpoint.
+    """
+    version = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+class ResponseCache:
+    """LRU of endpoint payloads, emptied whenever the DB version changes."""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._version = None
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    def get(self, version: tuple, key: tuple):
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        return None
+
+    def put(self, version: tuple, key: tuple, payload: Any):
+        if version != self._version:
+            return
+        self._entries[key] = payload
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+def cached_by_db_version(endpoint):
+    """
+    Reuse an endpoint's payload until the DB changes, and answer
+    If-None-Match revalidations with 304. The cache key is the endpoint
+    name plus its query parameters. The endpoint's `conn` is lent from the
+    pool only on a cache miss; 304s and hits never wait for a connection.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(request: Request, **kwargs):
+        version = _db_version()
+        key = (endpoint.__name__,) + tuple(kwargs.items())
+        digest = hashlib.blake2b(repr((version, key)).encode('utf-8'), digest_size=16).hexdigest()
+        headers = {"ETag": f'"{digest}"', "Cache-Control": "no-cache"}
+        
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        
+        payload = response_cache.get(version, key)
+        if payload is None:
+            conn = await run_in_threadpool(pool.acquire)
+            try:
+                payload = await endpoint(conn=conn, **kwargs)
+            finally:
+                pool.release(conn)
+            response_cache.put(version, key, payload)
+        return ORJSONResponse(payload, headers=headers)
+    
+    # Expose the endpoint's query parameters to FastAPI, plus the request;
+    # conn is supplied by the wrapper rather than by Depends(get_conn)
+    signature = inspect.signature(endpoint)
+    request_param = inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)
+    params = [p for name, p in signature.parameters.items() if name != 'conn']
+    wrapper.__signature__ = signature.replace(parameters=[request_param, *params])
+    return wrapper
+
+@app.get("/api/stats")
+@cached_by_db_version
+async def get_stats(conn: sqlite3.Connection = Depends(get_conn)):
+    # Total Pages
+    cursor = conn.execute("SELECT COUNT(*) as count FROM documents")
+    total_pages = cursor.fetchone()['count']
+    
+    # FAQs
+    cursor = conn.execute("SELECT COUNT(*) as count FROM faq_items")
+    total_faqs = cursor.fetchone()['count']
+    
+    # External Links
+    cursor = conn.execute("SELECT COUNT(*) as count FROM link_edges WHERE is_external=1")
+    total_external_links = cursor.fetchone()['count']
+    
+    # Status Distribution
+    cursor = conn.execute("SELECT status, COUNT(*) as count FROM documents GROUP BY status")
+    status_distribution = [{"name": row['status'], "value": row['count']} for row in cursor.fetchall()]
+    
+    # Answer Modes
+    cursor = conn.execute("SELECT answer_mode, COUNT(*) as count FROM faq_items GROUP BY answer_mode")
+    answer_modes = [{"name": row['answer_mode'], "value": row['count']} for row in cursor.fetchall()]
+    
+    return {
+        "overview": {
+            "totalPages": total_pages,
+            "totalFaqs": total_faqs,
+            "totalExternalLinks": total_external_links
+        },
+        "statusDistribution": status_distribution,
+        "answerModes": answer_modes
+    }
 
 @app.get("/api/external-stats")
-async def get_external_stats():
-    conn = get_db_connection()
+@cached_by_db_version
+async def get_external_stats(conn: sqlite3.Connection = Depends(get_conn)):
     try:
         logger.info("Fetching external stats...")
         
-        # 1. Total Unique External Domains (Global)
-        cursor = conn.execute("SELECT child_url FROM link_edges WHERE is_external=1")
-        rows = cursor.fetchall()
-        all_external_links = [row['child_url'] for row in rows]
-        logger.info(f"Found {len(all_external_links)} external links in link_edges")
+        # 1. Domain counts across all external links, aggregated in SQL via netloc()
+        cursor = conn.execute("""
+            SELECT netloc(child_url) as domain, COUNT(*) as count
+            FROM link_edges
+            WHERE is_external = 1
+            GROUP BY domain
+            HAVING domain != ''
+            ORDER BY count DESC
+        """)
+        domain_counts = cursor.fetchall()
         
-        all_domains = []
-        for url in all_external_links:
-            try:
-                if url:
-                    domain = urlparse(url).netloc
-                    if domain:
-                        all_domains.append(domain)
-            except Exception as e:
-                logger.warning(f"Failed to parse URL {url}: {e}")
-                pass
-                
-        unique_domains_total = len(set(all_domains))
+        unique_domains_total = len(domain_counts)
         logger.info(f"Total unique domains: {unique_domains_total}")
         
         # 2. Unique External Domains from FAQ Pages
-        cursor = conn.execute("SELECT url, meta_tags FROM documents")
-        faq_pages = []
-        for row in cursor.fetchall():
-            try:
-                tags = json.loads(row['meta_tags']) if row['meta_tags'] else {}
-                if tags.get('is_faq_page'):
-                    faq_pages.append(row['url'])
-            except:
-                pass
-        
-        logger.info(f"Found {len(faq_pages)} FAQ pages")
-        
-        unique_domains_faq = 0
-        if faq_pages:
-             # chunks to avoid sqlite limit if many pages
-             placeholders = ','.join(['?'] * len(faq_pages))
-             query = f"SELECT child_url FROM link_edges WHERE is_external=1 AND parent_url IN ({placeholders})"
-             cursor = conn.execute(query, faq_pages)
-             faq_external_links = [row['child_url'] for row in cursor.fetchall()]
-             
-             faq_domains = []
-             for url in faq_external_links:
-                 try:
-                     if url:
-                         domain = urlparse(url).netloc
-                         if domain:
-                             faq_domains.append(domain)
-                 except:
-                     pass
-             unique_domains_faq = len(set(faq_domains))
-             logger.info(f"Unique domains in FAQ pages: {unique_domains_faq}")
+        cursor = conn.execute("""
+            SELECT COUNT(DISTINCT netloc(e.child_url)) as count
+            FROM link_edges e
+            WHERE e.is_external = 1
+            AND e.parent_url IN (SELECT url FROM documents WHERE is_faq_page = 1)
+            AND netloc(e.child_url) != ''
+        """)
+        unique_domains_faq = cursor.fetchone()['count']
+        logger.info(f"Unique domains in FAQ pages: {unique_domains_faq}")
              
-        # 3. Top 10 Domains
-        top_domains = []
-        if all_domains:
-            domain_counts = pd.Series(all_domains).value_counts().head(10).to_dict()
-            top_domains = [{"domain": k, "count": int(v)} for k, v in domain_counts.items()]
+        # 3. Top 10 Domains (rows are already ordered by count)
+        top_domains = [{"domain": row['domain'], "count": row['count']} for row in domain_counts[:10]]
         
         # 4. Confidential Domains
-        sensitive_keywords = ['irs.gov', 'ssn', 'socialsecurity', 'login', 'account']
-        found_sensitive = []
-        unique_all_domains = set(all_domains)
-        for domain in unique_all_domains:
-            for kw in sensitive_keywords:
-                if kw in domain.lower():
-                    found_sensitive.append(domain)
+        found_sensitive = [row['domain'] for row in domain_counts if SENSITIVE_DOMAIN_RE.search(row['domain'])]
         
         return {
             "total_unique_domains": unique_domains_total,
@@ -161,85 +325,105 @@ async def get_external_stats():
     except Exception as e:
         logger.error(f"Error in get_external_stats: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 @app.get("/api/faqs/export")
 async def export_faqs_csv():
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("SELECT question_text, answer_text, answer_mode, document_url FROM faq_items")
-        rows = cursor.fetchall()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Question', 'Answer', 'Mode', 'Source URL'])
-        
-        for row in rows:
-            writer.writerow([row['question_text'], row['answer_text'], row['answer_mode'], row['document_url']])
+    if not os.path.exists(DB_PATH):
+        # Report a missing DB before the response starts, not mid-stream
+        raise HTTPException(status_code=404, detail="Database file not found")
+    
+    async def generate_csv():
+        # Acquired by the generator itself rather than via Depends: the
+        # connection must outlive the endpoint, and a stream that is never
+        # started (client gone before the first chunk) never takes one
+        conn = await run_in_threadpool(pool.acquire)
+        try:
+            cursor = conn.execute("SELECT question_text, answer_text, answer_mode, document_url FROM faq_items")
             
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=faqs_export.csv"}
-        )
-    finally:
-        conn.close()
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(['Question', 'Answer', 'Mode', 'Source URL'])
+            
+            # Yield in batches so memory stays flat regardless of table size
+            while True:
+                rows = cursor.fetchmany(CSV_EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+            
+            # Header only, when there are no FAQs
+            if output.tell():
+                yield output.getvalue()
+        finally:
+            pool.release(conn)
+    
+    return StreamingResponse(
+        generate_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=faqs_export.csv"}
+    )
+
+def fetch_dicts(conn: sqlite3.Connection, query: str, params=()) -> List[Dict[str, Any]]:
+    """
+    Run a query and return its rows as dicts. Rows are fetched as plain tuples
+    and zipped with column names read once, skipping sqlite3.Row per row.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _fts_phrase(text: str) -> str:
+    """Quote user input as a single FTS5 phrase so operators in it are taken literally."""
+    return '"' + text.replace('"', '""') + '"'
 
 @app.get("/api/faqs")
-async def get_faqs(limit: int = 1000, offset: int = 0, search: str = ""):
-    conn = get_db_connection()
-    try:
-        query = "SELECT * FROM faq_items"
-        params = []
-        if search:
-            query += " WHERE question_text LIKE ? OR answer_text LIKE ?"
-            params.extend([f"%{search}%", f"%{search}%"])
-        
-        query += " LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+async def get_faqs(limit: int = 1000, offset: int = 0, search: str = "", conn: sqlite3.Connection = Depends(get_conn)):
+    # Rows are plain JSON types; returning the response directly skips jsonable_encoder
+    if not search:
+        return ORJSONResponse(fetch_dicts(conn, SQL_FAQS, (limit, offset)))
+    if len(search) < FTS_TRIGRAM_MIN_LENGTH:
+        # Too short for the trigram index to match anything
+        return ORJSONResponse(fetch_dicts(conn, SQL_FAQS_SEARCH_LIKE, (f"%{search}%", f"%{search}%", limit, offset)))
+    return ORJSONResponse(fetch_dicts(conn, SQL_FAQS_SEARCH, (_fts_phrase(search), limit, offset)))
 
 @app.get("/api/pages")
-async def get_pages(limit: int = 100, offset: int = 0):
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute("SELECT url, status, content_type, depth_from_seed, crawled_at FROM documents LIMIT ? OFFSET ?", (limit, offset))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    finally:
-        conn.close()
+async def get_pages(limit: int = 100, offset: int = 0, conn: sqlite3.Connection = Depends(get_conn)):
+    return ORJSONResponse(fetch_dicts(conn, "SELECT url, status, content_type, depth_from_seed, crawled_at FROM documents LIMIT ? OFFSET ?", (limit, offset)))
 
 @app.get("/api/business-metrics")
-async def get_business_metrics():
+@cached_by_db_version
+async def get_business_metrics(conn: sqlite3.Connection = Depends(get_conn)):
     """
     Comprehensive business metrics for website health analysis.
     """
-    conn = get_db_connection()
     try:
         logger.info("Calculating business metrics...")
         
-        # 1. Content Health Metrics
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents")
-        total_pages = cursor.fetchone()['count']
-        
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE status LIKE 'HTTP_4%' OR status LIKE 'HTTP_5%'")
-        broken_pages = cursor.fetchone()['count']
-        
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE status = 'FETCH_ERROR'")
-        fetch_errors = cursor.fetchone()['count']
-        
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE status = 'BLOCKED_BY_ROBOTS'")
-        blocked_by_robots = cursor.fetchone()['count']
-        
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE status = 'CRAWLED'")
-        successful_crawls = cursor.fetchone()['count']
+        # 1. Content Health Metrics (one pass over documents for every per-page count)
+        cursor = conn.execute("""
+            SELECT
+                COUNT(*) as total_pages,
+                COUNT(*) FILTER (WHERE status >= 'HTTP_4' AND status < 'HTTP_6') as broken_pages,
+                COUNT(*) FILTER (WHERE status = 'FETCH_ERROR') as fetch_errors,
+                COUNT(*) FILTER (WHERE status = 'BLOCKED_BY_ROBOTS') as blocked_by_robots,
+                COUNT(*) FILTER (WHERE status = 'CRAWLED') as successful_crawls,
+                COUNT(*) FILTER (WHERE depth_from_seed > 3) as deep_pages_count,
+                COUNT(*) FILTER (WHERE content_type LIKE '%pdf%') as pdf_pages
+            FROM documents
+        """)
+        doc_counts = cursor.fetchone()
+        total_pages = doc_counts['total_pages']
+        broken_pages = doc_counts['broken_pages']
+        fetch_errors = doc_counts['fetch_errors']
+        blocked_by_robots = doc_counts['blocked_by_robots']
+        successful_crawls = doc_counts['successful_crawls']
+        deep_pages_count = doc_counts['deep_pages_count']
+        pdf_pages = doc_counts['pdf_pages']
         
         content_health_score = round((successful_crawls / total_pages * 100), 1) if total_pages > 0 else 0
         
@@ -247,32 +431,28 @@ async def get_business_metrics():
         cursor = conn.execute("SELECT depth_from_seed, COUNT(*) as count FROM documents WHERE depth_from_seed IS NOT NULL GROUP BY depth_from_seed ORDER BY depth_from_seed")
         depth_distribution = [{"depth": row['depth_from_seed'], "count": row['count']} for row in cursor.fetchall()]
         
-        # Deep pages (depth > 3)
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE depth_from_seed > 3")
-        deep_pages_count = cursor.fetchone()['count']
-        
-        # 3. FAQ Quality Metrics
-        cursor = conn.execute("SELECT COUNT(*) as count FROM faq_items")
-        total_faqs = cursor.fetchone()['count']
-        
-        cursor = conn.execute("SELECT answer_mode, COUNT(*) as count FROM faq_items GROUP BY answer_mode")
-        faq_modes = {row['answer_mode']: row['count'] for row in cursor.fetchall()}
+        # 3. FAQ Quality Metrics (one pass over faq_items; short = answers under 100 chars)
+        cursor = conn.execute("""
+            SELECT answer_mode, COUNT(*) as count, COUNT(*) FILTER (WHERE LENGTH(answer_text) < 100) as short
+            FROM faq_items
+            GROUP BY answer_mode
+        """)
+        mode_rows = cursor.fetchall()
+        faq_modes = {row['answer_mode']: row['count'] for row in mode_rows}
+        total_faqs = sum(faq_modes.values())
+        short_answers = sum(row['short'] for row in mode_rows)
         
         direct_text_faqs = faq_modes.get('DIRECT_TEXT', 0)
         self_service_rate = round((direct_text_faqs / total_faqs * 100), 1) if total_faqs > 0 else 0
         
         escalation_faqs = faq_modes.get('PHONE_ESCALATION', 0) + faq_modes.get('PORTAL_REDIRECT', 0)
         
-        # Short answers (less than 100 chars)
-        cursor = conn.execute("SELECT COUNT(*) as count FROM faq_items WHERE LENGTH(answer_text) < 100")
-        short_answers = cursor.fetchone()['count']
-        
         # 4. Pages without FAQs
         cursor = conn.execute("""
             SELECT COUNT(*) as count FROM documents d 
             WHERE d.status = 'CRAWLED' 
             AND d.content_type LIKE '%text/html%'
-            AND d.url NOT IN (SELECT DISTINCT document_url FROM faq_items)
+            AND NOT EXISTS (SELECT 1 FROM faq_items fi WHERE fi.document_url = d.url)
         """)
         pages_without_faqs = cursor.fetchone()['count']
         
@@ -280,15 +460,12 @@ async def get_business_metrics():
         cursor = conn.execute("SELECT COUNT(*) as count FROM assets WHERE asset_type = 'pdf'")
         pdf_count = cursor.fetchone()['count']
         
-        cursor = conn.execute("SELECT COUNT(*) as count FROM documents WHERE content_type LIKE '%pdf%'")
-        pdf_pages = cursor.fetchone()['count']
-        
         # 6. Orphan Pages (pages with no inbound internal links)
         cursor = conn.execute("""
             SELECT COUNT(*) as count FROM documents d
             WHERE d.status = 'CRAWLED'
-            AND d.url NOT IN (
-                SELECT DISTINCT child_url FROM link_edges WHERE is_external = 0
+            AND NOT EXISTS (
+                SELECT 1 FROM link_edges le WHERE le.child_url = d.url AND le.is_external = 0
             )
             AND d.depth_from_seed > 0
         """)
@@ -310,7 +487,7 @@ async def get_business_metrics():
         cursor = conn.execute("""
             SELECT url, status, depth_from_seed 
             FROM documents 
-            WHERE status LIKE 'HTTP_4%' OR status LIKE 'HTTP_5%' OR status = 'FETCH_ERROR'
+            WHERE (status >= 'HTTP_4' AND status < 'HTTP_6') OR status = 'FETCH_ERROR'
             LIMIT 20
         """)
         broken_links_detail = [{"url": row['url'], "status": row['status'], "depth": row['depth_from_seed']} for row in cursor.fetchall()]
@@ -350,72 +527,95 @@ async def get_business_metrics():
     except Exception as e:
         logger.error(f"Error in get_business_metrics: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+def _iter_paragraphs(content: str, min_length: int):
+    """
+    Yield whitespace-normalized paragraphs of at least min_length chars:
+    blank-line separated blocks first, then individual lines.
+    """
+    for separator in ('\n\n', '\n'):
+        # map/compress run the per-paragraph normalize + length filter in C
+        normalized = list(map(' '.join, map(str.split, content.split(separator))))
+        yield from compress(normalized, map(min_length.__le__, map(len, normalized)))
+
+def _paragraph_digest(paragraph: str) -> bytes:
+    # Content hash rather than hash(): no 64-bit collisions merging distinct paragraphs
+    return hashlib.blake2b(paragraph.encode('utf-8'), digest_size=16).digest()
 
 @app.get("/api/redundant-content")
-async def get_redundant_content(min_occurrences: int = 2, min_length: int = 50, limit: int = 50):
+@cached_by_db_version
+async def get_redundant_content(min_occurrences: int = 2, min_length: int = 50, limit: int = 50, conn: sqlite3.Connection = Depends(get_conn)):
     """
     Analyze scraped content for redundant paragraphs/strings.
     Returns content snippets that appear multiple times across pages.
     """
-    conn = get_db_connection()
+    content_query = "SELECT url, content FROM documents_fts WHERE content IS NOT NULL AND content != ''"
     try:
         logger.info("Analyzing content for redundancies...")
         
-        # Get all extracted text content from documents_fts
-        cursor = conn.execute("SELECT url, content FROM documents_fts WHERE content IS NOT NULL AND content != ''")
-        rows = cursor.fetchall()
-        
-        # Track paragraph occurrences: paragraph -> list of source URLs
-        paragraph_sources: Dict[str, List[str]] = {}
-        
-        for row in rows:
-            url = row['url']
-            content = row['content'] or ''
+        # Only paragraph digests are kept per page; SQLite does the grouping.
+        # Both passes over the content read one snapshot, so a crawl writing
+        # in between cannot change the paragraphs the second pass finds.
+        conn.execute("BEGIN")
+        conn.execute("CREATE TEMP TABLE paragraph_hashes (hash BLOB, url TEXT)")
+        try:
+            for row in conn.execute(content_query):
+                # dict keeps first-seen order, which breaks ties in the ranking below
+                hashes = dict.fromkeys(map(_paragraph_digest, _iter_paragraphs(row['content'], min_length)))
+                conn.executemany(
+                    "INSERT INTO paragraph_hashes (hash, url) VALUES (?, ?)",
+                    [(h, row['url']) for h in hashes]
+                )
+            conn.execute("CREATE INDEX temp.idx_paragraph_hashes ON paragraph_hashes(hash)")
             
-            # Split content into paragraphs (by double newlines or single newlines with length check)
-            paragraphs = []
-            for block in content.split('\n\n'):
-                block = block.strip()
-                if len(block) >= min_length:
-                    paragraphs.append(block)
+            # Most repeated first; ties keep the order paragraphs were first seen
+            cursor = conn.execute("""
+                SELECT hash, COUNT(DISTINCT url) as occurrences
+                FROM paragraph_hashes
+                GROUP BY hash
+                HAVING occurrences >= ?
+                ORDER BY occurrences DESC, MIN(rowid)
+            """, (min_occurrences,))
+            redundant_rows = cursor.fetchall()
+            total_redundant_blocks = len(redundant_rows)
+            top_rows = redundant_rows[:limit]
             
-            # Also check for repeated sentences/phrases within single-newline splits
-            for block in content.split('\n'):
-                block = block.strip()
-                if len(block) >= min_length and block not in paragraphs:
-                    paragraphs.append(block)
+            # Limit to first 5 URLs for display
+            source_urls = {}
+            for row in top_rows:
+                cursor = conn.execute("""
+                    SELECT url FROM paragraph_hashes WHERE hash = ?
+                    GROUP BY url ORDER BY MIN(rowid) LIMIT 5
+                """, (row['hash'],))
+                source_urls[row['hash']] = [r['url'] for r in cursor.fetchall()]
             
-            for para in paragraphs:
-                # Normalize whitespace for comparison
-                normalized = ' '.join(para.split())
-                if len(normalized) >= min_length:
-                    if normalized not in paragraph_sources:
-                        paragraph_sources[normalized] = []
-                    if url not in paragraph_sources[normalized]:
-                        paragraph_sources[normalized].append(url)
+            # Second pass recovers the text, only for the paragraphs being returned
+            texts = {}
+            if top_rows:
+                for row in conn.execute(content_query):
+                    for para in _iter_paragraphs(row['content'], min_length):
+                        h = _paragraph_digest(para)
+                        if h in source_urls and h not in texts:
+                            texts[h] = para
+                    if len(texts) == len(source_urls):
+                        break
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.paragraph_hashes")
+            conn.commit()
         
-        # Filter to only redundant content (appears in multiple pages)
         redundant_items = []
-        for content_str, sources in paragraph_sources.items():
-            if len(sources) >= min_occurrences:
-                # Truncate display snippet if too long
-                snippet = content_str[:200] + "..." if len(content_str) > 200 else content_str
-                redundant_items.append({
-                    "content_snippet": snippet,
-                    "full_content": content_str,
-                    "occurrences": len(sources),
-                    "source_urls": sources[:5]  # Limit to first 5 URLs for display
-                })
-        
-        # Sort by occurrences descending
-        redundant_items.sort(key=lambda x: x['occurrences'], reverse=True)
-        
-        # Limit results
-        redundant_items = redundant_items[:limit]
-        
-        total_redundant_blocks = len([p for p, s in paragraph_sources.items() if len(s) >= min_occurrences])
+        for row in top_rows:
+            content_str = texts.get(row['hash'])
+            if content_str is None:
+                continue
+            # Truncate display snippet if too long
+            snippet = content_str[:200] + "..." if len(content_str) > 200 else content_str
+            redundant_items.append({
+                "content_snippet": snippet,
+                "full_content": content_str,
+                "occurrences": row['occurrences'],
+                "source_urls": source_urls[row['hash']]
+            })
         
         logger.info(f"Found {total_redundant_blocks} redundant content blocks")
         
@@ -426,8 +626,6 @@ async def get_redundant_content(min_occurrences: int = 2, min_length: int = 50,
     except Exception as e:
         logger.error(f"Error in get_redundant_content: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
     import uvicorn
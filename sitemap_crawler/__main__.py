@@ -27,7 +27,7 @@ def crawl_command(args):
 
 def export_command(args):
     config = load_config(args.config)
-    exporter = JsonExporter(config)
+    exporter = JsonExporter(config, immutable=args.immutable)
     exporter.export_all()
 
 def validate_command(args):
@@ -47,6 +47,8 @@ def main():
     crawl_parser.set_defaults(func=crawl_command)
     
     export_parser = subparsers.add_parser('export', help='Export data to JSON')
+    export_parser.add_argument('--immutable', action='store_true',
+                               help='Read the database without locking; only when no crawl is writing to it')
     export_parser.set_defaults(func=export_command)
     
     validate_parser = subparsers.add_parser('validate', help='Validate configuration')
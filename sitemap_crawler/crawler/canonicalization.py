@@ -1,5 +1,20 @@
+import functools
+import re
 from urllib.parse import urlparse, urlunparse, urlencode, parse_qsl
 
+# Pages share most of their links (nav, footer), so the same URLs are
+# canonicalized over and over during a crawl
+URL_CACHE_SIZE = 131072
+QUERY_CACHE_SIZE = 65536
+
+# Hosts that are rewritten to their canonical form (Custom Domain Logic)
+NETLOC_ALIASES = {'example.com': 'www.example.com'}
+
+# Queries made only of key=value pairs using characters urlencode leaves
+# alone; for these the parse_qsl/urlencode round-trip is the identity
+_PLAIN_QUERY_RE = re.compile(r'[A-Za-z0-9_.~-]+=[A-Za-z0-9_.~-]+(?:&[A-Za-z0-9_.~-]+=[A-Za-z0-9_.~-]+)*')
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
 def canonicalize_url(url: str) -> str:
     """
     Canonicalize URLs so these are treated as the same:
@@ -17,8 +32,7 @@ def canonicalize_url(url: str) -> str:
     netloc = parsed.netloc.lower()
 
     # Force www.example.com (Custom Domain Logic)
-    if netloc == 'example.com':
-        netloc = 'www.example.com'
+    netloc = NETLOC_ALIASES.get(netloc, netloc)
     
     # 2. Path: remove trailing slash
     path = parsed.path
@@ -28,9 +42,7 @@ def canonicalize_url(url: str) -> str:
     # 3. Query: sort parameters
     query = parsed.query
     if query:
-        params = parse_qsl(query)
-        params.sort(key=lambda x: x[0])
-        query = urlencode(params)
+        query = _canon_query(query)
     
     # 4. Fragment: remove
     fragment = ''
@@ -38,6 +50,24 @@ def canonicalize_url(url: str) -> str:
     # Reconstruct
     return urlunparse((scheme, netloc, path, parsed.params, query, fragment))
 
+# Query strings repeat across URLs that differ only by path (tracking params)
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _canon_query(query: str) -> str:
+    """Sort query parameters by key."""
+    if _PLAIN_QUERY_RE.fullmatch(query):
+        # Only reorder, and only when the keys are out of order
+        if '&' in query:
+            params = query.split('&')
+            keys = [param.split('=', 1)[0] for param in params]
+            if any(a > b for a, b in zip(keys, keys[1:])):
+                order = sorted(range(len(params)), key=keys.__getitem__)
+                query = '&'.join(params[i] for i in order)
+        return query
+    params = parse_qsl(query)
+    params.sort(key=lambda x: x[0])
+    return urlencode(params)
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
 def get_domain(url: str) -> str:
     """Extract domain from URL."""
     return urlparse(url).netloc.lower()
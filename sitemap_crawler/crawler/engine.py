@@ -1,9 +1,15 @@
+import functools
 import logging
 import os
+import re
+import threading
 import time
 import requests
+from collections import defaultdict
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse
 import mimetypes
 
@@ -14,14 +20,43 @@ from sitemap_crawler.crawler.canonicalization import canonicalize_url, get_domai
 from sitemap_crawler.extractors.faq_extractor import FAQExtractor
 from sitemap_crawler.extractors.document_extractor import DocumentExtractor
 from sitemap_crawler.extractors.html_processor import get_soup, extract_links
-from sitemap_crawler.utils import generate_deterministic_filename, ensure_directory
+from sitemap_crawler.utils import url_hash, ensure_directory
 
 logger = logging.getLogger(__name__)
 
+# Servers send a handful of distinct Content-Type headers, so parse each once
+@functools.lru_cache(maxsize=1024)
+def _parse_content_type(raw: str) -> str:
+    return raw.split(';')[0].strip()
+
+def _content_type(response: requests.Response) -> str:
+    return _parse_content_type(response.headers.get('Content-Type', ''))
+
+@functools.lru_cache(maxsize=256)
+def _extension_for(content_type: str) -> str:
+    return mimetypes.guess_extension(content_type) or '.bin'
+
+def _extract_pdf_text(filepath: str) -> str:
+    """Runs in the PDF process pool; pypdf is pure Python and CPU-bound."""
+    from pypdf import PdfReader
+    reader = PdfReader(filepath)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() + "\n"
+    return text
+
+def _is_streamed_type(content_type: str) -> bool:
+    """Types whose bodies go straight to disk instead of memory."""
+    return 'application/pdf' in content_type or 'video' in content_type or 'audio' in content_type
+
 class Crawler:
     def __init__(self, config: Dict):
         self.config = config
         self.store = SqliteStore(config['db_path'])
+        # URLs in flight when a previous crawl stopped are fetched again
+        requeued = self.store.requeue_processing()
+        if requeued:
+            logger.info(f"Requeued {requeued} URLs left processing by an earlier crawl")
         self.fetcher = Fetcher(config)
         self.robots = RobotsParser(config['user_agent'], config.get('robots_enabled', True))
         self.faq_extractor = FAQExtractor()
@@ -31,7 +66,32 @@ class Crawler:
         self.max_depth_faq = config['max_depth_faq']
         self.max_depth_general = config['max_depth_general']
         self.excluded_sections = config.get('excluded_sitemap_sections', [])
+        # One alternation over the normalized section names, mapped back for logging
+        self._excluded_by_norm = {s.lower().replace(' ', ''): s for s in self.excluded_sections}
+        self._excluded_re = re.compile(
+            '|'.join(map(re.escape, self._excluded_by_norm))
+        ) if self._excluded_by_norm else None
         self.content_type_allowlist = config.get('content_type_allowlist', [])
+        self._allowed_types = frozenset(self.content_type_allowlist)
+        
+        # Assets with a larger Content-Length are not downloaded (None = no limit)
+        self.max_asset_bytes = config.get('max_asset_bytes')
+        
+        concurrency = config.get('concurrency', {})
+        self.workers = concurrency.get('workers', 8)
+        per_host = concurrency.get('per_host', 4)
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self.pdf_workers = config.get('pdf_workers', 4)
+        self._pdf_pool = None
+        self._pdf_pool_lock = threading.Lock()
+        
+        # Known URLs kept in memory so link dedup doesn't query SQLite per link
+        self.seen = self.store.load_seen_set()
+        # Child URLs queued by the page being handled, and by the pages of the
+        # open batch transaction; they only join `seen` once that commits, so
+        # a rolled-back queue insert can't hide a URL for the rest of the run
+        self._page_queued = ()
+        self._batch_queued = set()
         
         self.output_dirs = config['output_directories']
         for path in self.output_dirs.values():
@@ -42,40 +102,173 @@ class Crawler:
         for url in self.config['seed_urls']:
             if not self.store.is_url_visited_or_queued(url):
                 self.store.queue_url(url, depth=0, priority=100)
+            self.seen.add(url)
         
         logger.info("Crawl initialized. Starting loop...")
-        self.run_loop()
+        try:
+            self.run_loop()
+            self.store.optimize_fts()
+        finally:
+            self.fetcher.close()
+            if self._pdf_pool:
+                self._pdf_pool.shutdown()
 
     def run_loop(self):
-        """Main crawl loop."""
-        while True:
-            item = self.store.get_next_url()
-            if not item:
-                logger.info("Queue empty. Crawl finished.")
-                break
-                
-            url = item['url']
-            depth = item['depth']
-            parent_url = item['parent_url']
-            
-            logger.info(f"Processing: {url} (Depth: {depth})")
-            self.store.update_queue_status(url, 'processing')
-            
-            try:
-                self.process_url(url, depth, parent_url)
-                self.store.update_queue_status(url, 'completed')
-            except Exception as e:
-                logger.exception(f"Failed to process {url}")
-                self.store.update_queue_status(url, 'failed')
-                # Update document error if possible
-                self.store.upsert_document({
-                    'url': url,
-                    'status': 'ERROR',
-                    'error_message': str(e),
-                    'crawled_at': None # Keep null or set time?
-                })
+        """Main crawl loop.
+
+        Fetches run concurrently on a thread pool, up to `workers` in flight.
+        Parsing and every store write stay on this thread, as the SQLite
+        connection is not shared.
+        """
+        in_flight = {}  # future -> queue item
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                # Top up the window with pending URLs; the queue pops from
+                # memory, and their status updates share one commit. Fetches
+                # are submitted only once it lands: a rollback puts the URLs
+                # back in the queue, and they must not be in flight as well.
+                to_fetch = []
+                with self.store.transaction():
+                    while len(in_flight) + len(to_fetch) < self.workers:
+                        item = self.store.get_next_url()
+                        if not item:
+                            break
+                        url = item['url']
+                        logger.info(f"Processing: {url} (Depth: {item['depth']})")
+                        self.store.update_queue_status(url, 'processing')
+                        try:
+                            if self._should_fetch(url, item['depth']):
+                                to_fetch.append(item)
+                            else:
+                                self.store.update_queue_status(url, 'completed')
+                        except Exception as e:
+                            self._record_failure(url, e)
+                for item in to_fetch:
+                    slot = self._host_slots[get_domain(item['url'])]
+                    in_flight[executor.submit(self._fetch, item['url'], slot)] = item
+
+                if not in_flight:
+                    logger.info("Queue empty. Crawl finished.")
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                # One commit for every fetch that finished together; each URL's
+                # document, FAQs, edges and child queue rows form a savepoint
+                try:
+                    with self.store.transaction():
+                        while done:
+                            # Pop rather than iterate: the set would otherwise keep every
+                            # handled page's response alive until the whole batch is done
+                            future = done.pop()
+                            item = in_flight.pop(future)
+                            url = item['url']
+                            self._page_queued = ()
+                            try:
+                                response, error, body_path, pdf_text = future.result()
+                                with self.store.transaction():
+                                    self._process_response(url, item['depth'], response, error, body_path, pdf_text)
+                                    self.store.update_queue_status(url, 'completed')
+                                self._batch_queued.update(self._page_queued)
+                            except Exception as e:
+                                self._record_failure(url, e)
+                    self.seen.update(self._batch_queued)
+                finally:
+                    self._batch_queued.clear()
+
+    def _fetch(self, url: str, slot: threading.BoundedSemaphore):
+        """
+        Worker-thread fetch, holding one of the host's concurrency slots.
+        PDF text is extracted in the process pool before returning, so the
+        loop thread only ever sees a finished future.
+        """
+        with slot:
+            response, error, body_path = self._download(url)
+        pdf_text = None
+        if body_path and 'application/pdf' in _content_type(response):
+            pdf_text = self._pdf_executor().submit(_extract_pdf_text, body_path)
+            wait([pdf_text])
+        return response, error, body_path, pdf_text
+
+    def _pdf_executor(self) -> ProcessPoolExecutor:
+        # Created on first PDF; spawn rather than fork since fetch threads are running
+        with self._pdf_pool_lock:
+            if self._pdf_pool is None:
+                self._pdf_pool = ProcessPoolExecutor(
+                    max_workers=self.pdf_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pdf_pool
+
+    def _download(self, url: str) -> Tuple[Optional[requests.Response], Optional[str], Optional[str]]:
+        """
+        Fetches `url` and reads its body on the calling thread.
+        PDF and media bodies are streamed straight to their artifact path
+        rather than held in memory. Returns (response, error, body_path).
+        """
+        response, error = self.fetcher.fetch(url, stream=True)
+        if error:
+            return None, error, None
+        content_type = _content_type(response)
+        body_path = None
+        try:
+            if not self._is_allowed_type(content_type):
+                # Recorded as UNSUPPORTED_TYPE without its body; don't read it
+                response.close()
+                return response, None, None
+            if not _is_streamed_type(content_type):
+                response.content  # Buffer the body now, off the loop thread
+                return response, None, None
+            length = response.headers.get('Content-Length', '')
+            size = int(length) if length.isdigit() else 0
+            if self.max_asset_bytes is not None and size > self.max_asset_bytes:
+                logger.info(f"Skipping {size} byte asset over max_asset_bytes: {url}")
+                response.close()
+                return response, None, None
+            body_path = self._artifact_path(url, content_type)
+            self.fetcher.save_response(response, body_path)
+            response.close()
+            return response, None, body_path
+        except (requests.exceptions.RequestException, OSError) as e:
+            logger.error(f"Error downloading {url}: {e}")
+            response.close()
+            if body_path and os.path.exists(body_path):
+                os.remove(body_path)  # Don't leave a truncated artifact behind
+            return None, str(e), None
+
+    def _artifact_path(self, url: str, content_type: str) -> str:
+        if 'application/pdf' in content_type:
+            return os.path.join(self.output_dirs['pdf'], f"{url_hash(url)}.pdf")
+        return os.path.join(self.output_dirs['video'], url_hash(url) + _extension_for(content_type))
+
+    def _is_allowed_type(self, content_type: str) -> bool:
+        return not self._allowed_types or content_type in self._allowed_types
+
+    def _record_failure(self, url: str, error: Exception):
+        logger.exception(f"Failed to process {url}")
+        self.store.update_queue_status(url, 'failed')
+        # Update document error if possible
+        self.store.upsert_document({
+            'url': url,
+            'status': 'ERROR',
+            'error_message': str(error),
+            'crawled_at': None # Keep null or set time?
+        })
 
     def process_url(self, url: str, depth: int, parent_url: Optional[str]):
+        if not self._should_fetch(url, depth):
+            return
+        # 4. Fetch
+        # Check if it's likely a binary file based on extension first to decide handling
+        # But we need Content-Type header to be sure.
+        # Fetcher handles simple GET.
+        response, error, body_path = self._download(url)
+        self._page_queued = ()
+        self._process_response(url, depth, response, error, body_path)
+        # Outside run_loop each page's writes commit as they are made
+        self.seen.update(self._page_queued)
+
+    def _should_fetch(self, url: str, depth: int) -> bool:
+        """Robots, domain and policy checks; records skipped URLs."""
         # 1. Check robots.txt
         if not self.robots.can_fetch(url):
             logger.warning(f"Blocked by robots.txt: {url}")
@@ -84,35 +277,35 @@ class Crawler:
                 'status': 'BLOCKED_BY_ROBOTS',
                 'depth_from_seed': depth
             })
-            return
+            return False
 
         # 2. Domain check (double check)
         domain = get_domain(url)
         if domain not in self.allowed_domains:
             # Should have been filtered before queueing, but safety net
             logger.info(f"Skipping external domain: {url}")
-            return
+            return False
 
         # 3. Policy check (Accounts/Payments/IR)
-        for section in self.excluded_sections:
-            # Simple keyword check in path or text? Spec says "sitemap headings".
-            # Mapping URL structure to these headings is heuristic if not explicit.
-            # Assuming URL path components reflect structure.
-            if section.lower().replace(' ', '') in url.lower().replace('-', ''):
-                 logger.info(f"Skipping excluded section {section}: {url}")
-                 self.store.upsert_document({
-                    'url': url,
-                    'status': 'SKIPPED_BY_POLICY',
-                    'depth_from_seed': depth
-                })
-                 return
+        # Simple keyword check in path or text? Spec says "sitemap headings".
+        # Mapping URL structure to these headings is heuristic if not explicit.
+        # Assuming URL path components reflect structure.
+        match = self._excluded_re.search(url.lower().replace('-', '')) if self._excluded_re else None
+        if match:
+            section = self._excluded_by_norm[match.group()]
+            logger.info(f"Skipping excluded section {section}: {url}")
+            self.store.upsert_document({
+                'url': url,
+                'status': 'SKIPPED_BY_POLICY',
+                'depth_from_seed': depth
+            })
+            return False
 
-        # 4. Fetch
-        # Check if it's likely a binary file based on extension first to decide handling
-        # But we need Content-Type header to be sure.
-        # Fetcher handles simple GET.
-        response, error = self.fetcher.fetch(url)
-        
+        return True
+
+    def _process_response(self, url: str, depth: int, response: Optional[requests.Response],
+                          error: Optional[str], body_path: Optional[str] = None,
+                          pdf_text: Optional[Future] = None):
         if error:
             self.store.upsert_document({
                 'url': url,
@@ -131,10 +324,10 @@ class Crawler:
             })
             return
             
-        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        content_type = _content_type(response)
         
         # 5. Content Type Validation
-        if self.content_type_allowlist and content_type not in self.content_type_allowlist:
+        if not self._is_allowed_type(content_type):
             logger.info(f"Skipping unsupported content type {content_type}: {url}")
             self.store.upsert_document({
                 'url': url,
@@ -143,6 +336,15 @@ class Crawler:
                 'depth_from_seed': depth
             })
             return
+        
+        if _is_streamed_type(content_type) and body_path is None:
+            self.store.upsert_document({
+                'url': url,
+                'status': 'SKIPPED_TOO_LARGE',
+                'content_type': content_type,
+                'depth_from_seed': depth
+            })
+            return
 
         # 6. Save Artifacts & Process
         # Upsert document initially to satisfy FK constraints for children/FAQs
@@ -162,9 +364,9 @@ class Crawler:
             if 'text/html' in content_type:
                 self._handle_html(url, response, doc_data, depth)
             elif 'application/pdf' in content_type:
-                self._handle_pdf(url, response, doc_data)
+                self._handle_pdf(url, body_path, doc_data, pdf_text)
             elif 'video' in content_type or 'audio' in content_type:
-                self._handle_media(url, response, doc_data)
+                self._handle_media(url, body_path, doc_data)
             else:
                 # Fallback for other allowed types if any
                 pass
@@ -178,30 +380,30 @@ class Crawler:
 
 
     def _handle_html(self, url: str, response: requests.Response, doc_data: Dict, depth: int):
-        html_content = response.text
-        
-        # Save Raw HTML
-        filename = generate_deterministic_filename(url, '.html')
-        filepath = os.path.join(self.output_dirs['html'], filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Save Raw HTML; the .html and .md artifacts share one filename stem
+        name = url_hash(url)
+        filepath = os.path.join(self.output_dirs['html'], f"{name}.html")
+        # The body bytes as served: no re-encode of the decoded text
+        with open(filepath, 'wb') as f:
+            f.write(response.content)
         doc_data['local_artifact_paths']['html'] = filepath
         
+        # Parse once; content, FAQ and link extraction share the tree.
+        # The decoded text is only needed for the parse, so it isn't kept alive
+        # next to the tree for the rest of the page.
+        soup = get_soup(response.text)
+        
         # Extract Content
-        extracted = self.doc_extractor.extract_content(html_content, url)
+        extracted = self.doc_extractor.extract_content(None, url, soup=soup)
         doc_data['extracted_text'] = extracted['extracted_text']
         doc_data['title'] = extracted['title']
         
         # Save Markdown
-        md_filename = generate_deterministic_filename(url, '.md')
-        md_filepath = os.path.join(self.output_dirs['md'], md_filename)
+        md_filepath = os.path.join(self.output_dirs['md'], f"{name}.md")
         with open(md_filepath, 'w', encoding='utf-8') as f:
             f.write(extracted['markdown_content'])
         doc_data['local_artifact_paths']['md'] = md_filepath
         
-        # Parse for Links & FAQs
-        soup = get_soup(html_content)
-        
         # FAQ Extraction
         # Spec implies "FAQ-structured pages". Heuristic detection? 
         # Or just try extraction on all pages and see if we get structured FAQs?
@@ -224,14 +426,14 @@ class Crawler:
         faqs = self.faq_extractor.extract(soup, url)
         is_faq_page = len(faqs) > 0
         
-        if faqs:
-            self.store.add_faq_items(faqs)
-            
         doc_data['meta_tags'] = {'is_faq_page': is_faq_page}
 
         # Link Extraction & Queueing
         links = extract_links(soup, url)
         edges = []
+        to_queue = {}  # canonical url -> row, first link wins
+        external_urls = {}  # dicts as ordered sets
+        external_domains = {}
         
         # Determine max depth for THIS page's children
         # If this page is FAQ page, maybe we allow going deeper? 
@@ -265,38 +467,36 @@ class Crawler:
             })
             
             if is_external:
-                self.store.register_external_url(child_url)
-                self.store.register_external_domain(child_domain)
+                external_urls[child_url] = None
+                external_domains[child_domain] = None
             else:
                 # Internal Link -> Queue
                 # Enforce depth
                 next_depth = depth + 1
                 if next_depth <= effective_limit:
-                    if not self.store.is_url_visited_or_queued(canonical_child):
-                        self.store.queue_url(canonical_child, next_depth, parent_url=url)
+                    if (canonical_child not in self.seen and canonical_child not in self._batch_queued
+                            and canonical_child not in to_queue):
+                        to_queue[canonical_child] = (canonical_child, next_depth, url)
         
-        self.store.add_link_edges(edges)
+        # One transaction per page instead of a commit per link
+        with self.store.transaction():
+            self.store.add_faq_items(faqs)
+            self.store.bulk_register_external(list(external_urls), list(external_domains))
+            self.store.bulk_queue_urls(list(to_queue.values()))
+            self.store.add_link_edges(edges)
+        self._page_queued = list(to_queue)
 
-    def _handle_pdf(self, url: str, response: requests.Response, doc_data: Dict):
-        filename = generate_deterministic_filename(url, '.pdf')
-        filepath = os.path.join(self.output_dirs['pdf'], filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-            
+    def _handle_pdf(self, url: str, filepath: str, doc_data: Dict, pdf_text: Optional[Future] = None):
+        # Body was already streamed to filepath by _download
         doc_data['local_artifact_paths']['pdf'] = filepath
         
         # Text extraction (placeholder or use pypdf if installed)
         # Spec says "Extract full text".
+        # run_loop hands over text already extracted in the process pool
         try:
-            from pypdf import PdfReader
-            reader = PdfReader(filepath)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            text = pdf_text.result() if pdf_text else _extract_pdf_text(filepath)
             
-            txt_filename = generate_deterministic_filename(url, '.txt')
-            txt_filepath = os.path.join(self.output_dirs['pdf_text'], txt_filename)
+            txt_filepath = os.path.join(self.output_dirs['pdf_text'], f"{url_hash(url)}.txt")
             with open(txt_filepath, 'w', encoding='utf-8') as f:
                 f.write(text)
                 
@@ -328,17 +528,11 @@ class Crawler:
             'local_path': filepath
         })
 
-    def _handle_media(self, url: str, response: requests.Response, doc_data: Dict):
+    def _handle_media(self, url: str, filepath: str, doc_data: Dict):
         # Spec: "Try subtitles first; else local STT... If video/audio can’t be downloaded: record VIDEO_UNAVAILABLE"
         # This implies we try to download.
-        # Simple implementation: save bytes.
-        ext = mimetypes.guess_extension(doc_data['content_type']) or '.bin'
-        filename = generate_deterministic_filename(url, ext)
-        filepath = os.path.join(self.output_dirs['video'], filename)
-        
+        # Simple implementation: save bytes (streamed to filepath by _download).
         try:
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
             doc_data['local_artifact_paths']['video'] = filepath
             
             self.store.add_asset({
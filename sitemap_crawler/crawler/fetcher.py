@@ -1,10 +1,13 @@
 import requests
+import threading
 import time
 import logging
 from typing import Optional, Dict, Tuple
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from sitemap_crawler.crawler.canonicalization import get_domain
+
 class Fetcher:
     def __init__(self, config: Dict):
         self.user_agent = config.get('user_agent', 'Sitemap_Crawler_Bot/1.0')
@@ -24,26 +27,42 @@ class Fetcher:
             status_forcelist=[429, 500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "OPTIONS"]
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Keep-alive pool: one connection per in-flight fetch, so concurrent
+        # workers never discard connections to the same host
+        workers = config.get('concurrency', {}).get('workers', 8)
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=max(64, workers),
+            max_retries=retry_strategy
+        )
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
         
-        self.last_request_time = 0
+        self.last_request_time = {}  # domain -> time of its latest reserved request
+        self._rate_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
 
-    def _wait_for_rate_limit(self):
-        now = time.time()
-        elapsed = now - self.last_request_time
-        if elapsed < self.delay:
-            time.sleep(self.delay - elapsed)
-        self.last_request_time = time.time()
+    def _wait_for_rate_limit(self, url: str):
+        # The delay is per host, so fetches to different hosts overlap.
+        # Fetches run on several threads: reserve the host's next request
+        # slot under the lock, then sleep outside it
+        domain = get_domain(url)
+        with self._rate_lock:
+            now = time.time()
+            slot = max(now, self.last_request_time.get(domain, 0) + self.delay)
+            self.last_request_time[domain] = slot
+        if slot > now:
+            time.sleep(slot - now)
+
+    def close(self):
+        self.session.close()
 
     def fetch(self, url: str, stream: bool = False) -> Tuple[Optional[requests.Response], Optional[str]]:
         """
         Fetches the URL.
         Returns (response, error_message).
         """
-        self._wait_for_rate_limit()
+        self._wait_for_rate_limit(url)
         try:
             # First, check content type with HEAD if likely a large file? 
             # Actually, standard requests usage:
@@ -60,6 +79,12 @@ class Fetcher:
             self.logger.error(f"Error fetching {url}: {e}")
             return None, str(e)
             
+    def save_response(self, response: requests.Response, target_path: str, chunk_size: int = 1024 * 1024):
+        """Streams a stream=True response body to target_path in chunks."""
+        with open(target_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
     def download_file(self, url: str, target_path: str) -> bool:
         """Downloads a file to the target path."""
         response, error = self.fetch(url, stream=True)
@@ -67,10 +92,10 @@ class Fetcher:
             return False
             
         try:
-            with open(target_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            self.save_response(response, target_path)
             return True
         except Exception as e:
             self.logger.error(f"Error saving file {url} to {target_path}: {e}")
             return False
+        finally:
+            response.close()
@@ -8,14 +8,21 @@ class RobotsParser:
         self.user_agent = user_agent
         self.enabled = enabled
         self.parsers = {} # domain -> RobotFileParser
+        # (scheme://netloc, parser) of the last lookup; crawls stay on one
+        # host for long runs, so most URLs skip urlparse entirely
+        self._last = ('', None)
         self.logger = logging.getLogger(__name__)
 
     def can_fetch(self, url: str) -> bool:
         if not self.enabled:
             return True
 
+        prefix, rp = self._last
+        if rp is not None and url.startswith(prefix) and url[len(prefix):len(prefix) + 1] in ('', '/', '?', '#'):
+            return rp.can_fetch(self.user_agent, url)
+
         parsed = urlparse(url)
-        domain = parsed.netloc
+        domain = parsed.netloc.lower()
         scheme = parsed.scheme
         
         if not domain:
@@ -45,4 +52,6 @@ class RobotsParser:
                 rp.allow_all = True
                 self.parsers[domain] = rp
 
-        return self.parsers[domain].can_fetch(self.user_agent, url)
+        rp = self.parsers[domain]
+        self._last = (f"{scheme}://{parsed.netloc}", rp)
+        return rp.can_fetch(self.user_agent, url)
@@ -1,17 +1,22 @@
-import json
 import logging
 import os
+import orjson
 from pathlib import Path
 from typing import Dict, List, Any
 from sitemap_crawler.storage.sqlite_store import SqliteStore
 
 logger = logging.getLogger(__name__)
 
+# Columns stored as JSON text that are exported as nested objects
+JSON_COLUMNS = {'local_artifact_paths', 'meta_tags'}
+EXPORT_BATCH_SIZE = 10000
+
 class JsonExporter:
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, immutable: bool = False):
         self.db_path = config['db_path']
         self.output_dir = config['output_directories']['json']
-        self.store = SqliteStore(self.db_path)
+        # immutable: the crawl is finished, so read the file without locking
+        self.store = SqliteStore(self.db_path, immutable=immutable)
         
         # Ensure output directory exists
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
@@ -32,34 +37,32 @@ class JsonExporter:
         logger.info(f"Exporting to {path}")
         
         cursor = self.store.conn.cursor()
+        # Plain tuples; rows are zipped with the column names below
+        cursor.row_factory = None
         cursor.execute(query)
+        columns = [d[0] for d in cursor.description]
+        json_indexes = [i for i, name in enumerate(columns) if name in JSON_COLUMNS]
         
-        with open(path, 'w', encoding='utf-8') as f:
+        with open(path, 'wb') as f:
             while True:
-                rows = cursor.fetchmany(1000)
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
                 if not rows:
                     break
+                buffer = bytearray()
                 for row in rows:
-                    # Convert row to dict
-                    item = dict(row)
-                    # Handle JSON fields if any explicitly needed or just dump
-                    # SQLite Row factory is used in store, but here we might get Row objects.
-                    # dict(row) works with sqlite3.Row
-                    
+                    item = dict(zip(columns, row))
                     # Parse internal JSON strings back to objects if they are stored as strings in DB
                     # documents table has local_artifact_paths and meta_tags as JSON text
-                    if 'local_artifact_paths' in item and isinstance(item['local_artifact_paths'], str):
-                        try:
-                            item['local_artifact_paths'] = json.loads(item['local_artifact_paths'])
-                        except:
-                            pass
-                    if 'meta_tags' in item and isinstance(item['meta_tags'], str):
-                         try:
-                            item['meta_tags'] = json.loads(item['meta_tags'])
-                         except:
-                            pass
-                            
-                    f.write(json.dumps(item) + '\n')
+                    for i in json_indexes:
+                        value = row[i]
+                        if isinstance(value, str):
+                            try:
+                                item[columns[i]] = orjson.loads(value)
+                            except orjson.JSONDecodeError:
+                                pass
+                    buffer += orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+                # One write per batch
+                f.write(buffer)
 
     def _write_json(self, filename: str, query: str):
         path = os.path.join(self.output_dir, filename)
@@ -71,8 +74,8 @@ class JsonExporter:
         
         data = [dict(row) for row in rows]
         
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     def export_documents(self):
         self._write_jsonl('documents.jsonl', "SELECT * FROM documents")
@@ -1,4 +1,6 @@
+import copy
 import markdownify
+import soupsieve
 from bs4 import BeautifulSoup
 import logging
 from typing import Dict, Any, List, Optional
@@ -8,16 +10,23 @@ logger = logging.getLogger(__name__)
 class DocumentExtractor:
     def __init__(self, config: Dict):
         self.main_content_selectors = config.get('main_content_selectors', ['main', '#main-content', 'article'])
+        # Compiled once; select_one/soupsieve.match would re-resolve the strings per page
+        self._compiled_selectors = [soupsieve.compile(sel) for sel in self.main_content_selectors]
+        self._main_union = soupsieve.compile(', '.join(self.main_content_selectors)) if self.main_content_selectors else None
         self.html_to_md_options = {
             'heading_style': 'ATX',
             'strip': ['script', 'style', 'noscript', 'iframe', 'svg', 'nav', 'footer']
         }
+        self.md_converter = markdownify.MarkdownConverter(**self.html_to_md_options)
 
-    def extract_content(self, html_content: str, url: str) -> Dict[str, Any]:
+    def extract_content(self, html_content: Optional[str], url: str, soup: Optional[BeautifulSoup] = None) -> Dict[str, Any]:
         """
         Extracts main content and converts to Markdown.
+        Pass `soup` to reuse a tree the caller already parsed; html_content
+        is then not needed and may be None.
         """
-        soup = BeautifulSoup(html_content, 'lxml')
+        if soup is None:
+            soup = BeautifulSoup(html_content, 'lxml')
         
         # 1. Identify Main Content
         main_content_soup = self._find_main_content(soup)
@@ -33,7 +42,10 @@ class DocumentExtractor:
         # But also "avoid nav/footer noise".
         
         try:
-            markdown_content = markdownify.markdownify(str(main_content_soup), **self.html_to_md_options)
+            # Convert a copy of the subtree: converting the tree itself would strip
+            # whitespace nodes in place and alter the soup shared with the FAQ extractor.
+            # Copying is about twice as fast as serializing and re-parsing it.
+            markdown_content = self.md_converter.convert_soup(copy.copy(main_content_soup))
         except Exception as e:
             logger.error(f"Error converting HTML to Markdown for {url}: {e}")
             markdown_content = ""
@@ -49,10 +61,14 @@ class DocumentExtractor:
         Attempts to find the main content area using configured selectors.
         Falls back to body if not found.
         """
-        for selector in self.main_content_selectors:
-            selection = soup.select_one(selector)
-            if selection:
-                return selection
+        # One traversal collects candidates for every selector (in document order);
+        # the first candidate per selector, in priority order, is what a
+        # select_one per selector would have returned
+        candidates = self._main_union.select(soup) if self._main_union else []
+        for selector in self._compiled_selectors:
+            for candidate in candidates:
+                if selector.match(candidate):
+                    return candidate
         
         # Fallback: Body without nav/footer if possible
         body = soup.body
@@ -1,10 +1,55 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+import copy
 import logging
 from typing import List, Dict, Any, Optional
 import re
+import soupsieve
 
 logger = logging.getLogger(__name__)
 
+# FAQ containers, one selector per extraction strategy (in cascade order)
+_STRATEGY_SELECTORS = ['details', 'dl', '.accordion-card', '.faq_ques_text']
+_STRATEGY_MATCHERS = [soupsieve.compile(sel) for sel in _STRATEGY_SELECTORS]
+_CONTAINERS = soupsieve.compile(', '.join(_STRATEGY_SELECTORS))
+
+
+def _contents_without(parent: Tag, skip: Tag):
+    """
+    Returns (html, text, links) for the children of parent other than skip,
+    matching what the parent would render with skip decomposed.
+    """
+    html_parts = []
+    text_parts = []
+    links = []
+    string_types = tuple(parent.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES)
+    for child in parent.children:
+        if child is skip:
+            continue
+        if isinstance(child, Tag):
+            html_parts.append(child.decode())
+            # Judge strings by the parent's types, as the parent's get_text would
+            text = child.get_text(separator=' ', strip=True, types=string_types)
+            if text:
+                text_parts.append(text)
+            if child.name == 'a':
+                links.append(child)
+            links.extend(child.find_all('a'))
+        else:
+            html_parts.append(child.output_ready())
+            if type(child) in string_types and child.strip():
+                text_parts.append(child.strip())
+    return ''.join(html_parts).strip(), ' '.join(text_parts), links
+
+def _answer_links(answer_el: Tag, answer_html: str) -> List[Tag]:
+    # An <a> anywhere in the answer shows up in its rendered HTML, so the
+    # tree only needs searching when that text is present
+    if '<a' not in answer_html:
+        return []
+    return answer_el.find_all('a')
+
+# Regex for simple phone detection
+_PHONE_RE = re.compile(r'(\+\d{1,2}\s)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}')
+
 class FAQExtractor:
     def __init__(self):
         pass
@@ -33,46 +78,55 @@ class FAQExtractor:
         
         candidates = []
         
+        # One traversal collects the containers for every strategy, bucketed
+        # in document order; the strategies still run as a fallback cascade
+        buckets = [[] for _ in _STRATEGY_MATCHERS]
+        for el in _CONTAINERS.select(soup):
+            for bucket, matcher in zip(buckets, _STRATEGY_MATCHERS):
+                if matcher.match(el):
+                    bucket.append(el)
+        details_els, dl_els, accordion_cards, question_els = buckets
+        
         # Check for standard details/summary
-        for details in soup.find_all('details'):
+        for details in details_els:
             summary = details.find('summary')
             if summary:
                 question = summary.get_text(strip=True)
                 # Answer is everything else in details
                 # We need to exclude summary from answer
-                answer_html = ""
-                answer_text = ""
-                
-                # Clone details to manipulate
-                import copy
-                details_clone = copy.copy(details)
-                if details_clone.find('summary'):
+                if summary.parent is details:
+                    answer_html, answer_text, answer_links = _contents_without(details, summary)
+                else:
+                    # Nested summary: clone details so it can be removed
+                    details_clone = copy.copy(details)
                     details_clone.find('summary').decompose()
-                
-                answer_html = str(details_clone.encode_contents().decode('utf-8')).strip()
-                answer_text = details_clone.get_text(separator=' ', strip=True)
+                    answer_html = details_clone.decode_contents().strip()
+                    answer_text = details_clone.get_text(separator=' ', strip=True)
+                    answer_links = _answer_links(details_clone, answer_html)
                 
                 if question and answer_text:
                     candidates.append({
                         'question': question,
                         'answer_text': answer_text,
-                        'answer_html': answer_html
+                        'answer_html': answer_html,
+                        'answer_links': answer_links
                     })
 
         # Check for common Accordion patterns if details/summary not found or mixed
         # Often: .accordion-header / .accordion-content
         # Or: dt / dd
         if not candidates:
-             dls = soup.find_all('dl')
-             for dl in dls:
+             for dl in dl_els:
                  dts = dl.find_all('dt')
                  for dt in dts:
                      dd = dt.find_next_sibling('dd')
                      if dd:
+                         answer_html = dd.decode_contents().strip()
                          candidates.append({
                              'question': dt.get_text(strip=True),
                              'answer_text': dd.get_text(separator=' ', strip=True),
-                             'answer_html': str(dd.encode_contents().decode('utf-8')).strip()
+                             'answer_html': answer_html,
+                             'answer_links': _answer_links(dd, answer_html)
                          })
 
         # Strategy 3: Bootstrap Accordion (.accordion-card)
@@ -84,7 +138,6 @@ class FAQExtractor:
         #   </div>
         # </div>
         if not candidates:
-            accordion_cards = soup.select('.accordion-card')
             for card in accordion_cards:
                 question_text = ""
                 # Question is usually in card-header -> button
@@ -101,18 +154,19 @@ class FAQExtractor:
                 card_body = card.select_one('.card-body')
                 
                 if card_body and question_text:
+                    answer_html = card_body.decode_contents().strip()
                     candidates.append({
                         'question': question_text,
                         'answer_text': card_body.get_text(separator=' ', strip=True),
-                        'answer_html': str(card_body.encode_contents().decode('utf-8')).strip()
+                        'answer_html': answer_html,
+                        'answer_links': _answer_links(card_body, answer_html)
                     })
 
         # Strategy 4: Specific Custom Structure
         # <p class="faq_ques_text bold">Question</p>
         # <div class="col-sm-12 faq-ans">Answer</div>
         if not candidates:
-            # Look for the question container
-            question_els = soup.select('.faq_ques_text')
+            # Look for the question container (question_els)
             for q_el in question_els:
                 question_text = q_el.get_text(strip=True)
                 
@@ -129,10 +183,12 @@ class FAQExtractor:
                 answer_el = parent.select_one('.faq-ans')
                 
                 if answer_el:
+                    answer_html = answer_el.decode_contents().strip()
                     candidates.append({
                         'question': question_text,
                         'answer_text': answer_el.get_text(separator=' ', strip=True),
-                        'answer_html': str(answer_el.encode_contents().decode('utf-8')).strip()
+                        'answer_html': answer_html,
+                        'answer_links': _answer_links(answer_el, answer_html)
                     })
 
         # If still no candidates, we might look for headings followed by text blocks if the page title implies FAQ.
@@ -145,13 +201,13 @@ class FAQExtractor:
                 'question_text': item['question'],
                 'answer_text': item['answer_text'],
                 'answer_raw_html': item['answer_html'],
-                'answer_mode': self._determine_answer_mode(item['answer_text'], item['answer_html']),
+                'answer_mode': self._determine_answer_mode(item['answer_text'], item['answer_html'], item['answer_links']),
                 'link_depth_to_answer': 0 if len(item['answer_text']) > 50 else None # Placeholder logic
             })
             
         return faqs
 
-    def _determine_answer_mode(self, text: str, html: str) -> str:
+    def _determine_answer_mode(self, text: str, html: str, links: List[Tag]) -> str:
         """
         Compute answer mode:
         DIRECT_TEXT (answer length > threshold)
@@ -160,30 +216,31 @@ class FAQExtractor:
         PDF_ATTACHMENT (pdf referenced)
         VIDEO (video/transcript referenced)
         PORTAL_REDIRECT (login/portal link detected)
+        
+        `links` are the <a> tags of the already-parsed answer element, so
+        the answer HTML doesn't need re-parsing.
         """
         mode = "DIRECT_TEXT"
         
-        soup = BeautifulSoup(html, 'html.parser')
-        links = soup.find_all('a')
-        
-        has_links = len(links) > 0
-        has_pdf = any(l.get('href', '').lower().endswith('.pdf') for l in links)
-        has_portal = any('login' in l.get('href', '').lower() or 'account' in l.get('href', '').lower() for l in links)
-        
-        # Check for phone numbers
-        # Regex for simple phone detection
-        phone_pattern = re.compile(r'(\+\d{1,2}\s)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}')
-        has_phone = bool(phone_pattern.search(text))
-        
-        if has_portal:
-            return "PORTAL_REDIRECT"
+        # One pass over the hrefs; signals are then tested in priority order
+        # so cheaper/earlier checks short-circuit the rest
+        has_pdf = False
+        for l in links:
+            href = l.get('href', '').lower()
+            if 'login' in href or 'account' in href:
+                return "PORTAL_REDIRECT"
+            if href.endswith('.pdf'):
+                has_pdf = True
         if has_pdf:
             return "PDF_ATTACHMENT"
-        if "video" in html.lower() or "transcript" in html.lower():
+        
+        lowered = html.lower()
+        if "video" in lowered or "transcript" in lowered:
             return "VIDEO" # Simple heuristic
-        if has_phone:
+        # Check for phone numbers
+        if _PHONE_RE.search(text):
             return "PHONE_ESCALATION"
-        if has_links:
+        if links:
             return "LINK_OUT"
             
         return mode
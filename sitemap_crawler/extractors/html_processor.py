@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 import logging
 from typing import List, Dict, Optional, Set
 from urllib.parse import urljoin, urlparse
@@ -6,27 +6,52 @@ import re
 
 logger = logging.getLogger(__name__)
 
+# hrefs that are not crawlable links
+_SKIP_SCHEMES = ('javascript:', 'mailto:', 'tel:')
+
 def get_soup(html_content: str) -> BeautifulSoup:
     return BeautifulSoup(html_content, 'lxml')
 
+def _anchor_text(a: Tag) -> str:
+    # Most anchors hold a single string; skip get_text's generator for those
+    if len(a.contents) == 1 and type(a.contents[0]) is NavigableString:
+        return a.contents[0].strip()
+    return a.get_text(strip=True)
+
 def extract_links(soup: BeautifulSoup, base_url: str) -> List[Dict[str, str]]:
     """
     Extracts all links from the soup.
     Returns a list of dicts with 'url', 'text', 'rel'.
     """
     links = []
-    for a in soup.find_all('a', href=True):
-        href = a['href'].strip()
-        if not href or href.startswith(('javascript:', 'mailto:', 'tel:')):
+    # raw href -> absolute url, or None when skipped; nav/footer links
+    # repeat on a page, so each distinct href is checked only once
+    resolved = {}
+    for a in soup.descendants:
+        if a.name != 'a':
+            continue
+        attrs = a.attrs
+        raw = attrs.get('href')
+        if raw is None:
+            continue
+        if raw in resolved:
+            absolute_url = resolved[raw]
+        else:
+            href = raw.strip()
+            if not href or href.startswith(_SKIP_SCHEMES):
+                absolute_url = None
+            else:
+                absolute_url = urljoin(base_url, href)
+            resolved[raw] = absolute_url
+        if absolute_url is None:
             continue
             
-        absolute_url = urljoin(base_url, href)
-        text = a.get_text(strip=True)
+        text = _anchor_text(a)
         
         links.append({
             'url': absolute_url,
             'text': text,
-            'rel': a.get('rel', [])
+            'rel': attrs.get('rel', [])
         })
     return links
 
@@ -36,9 +61,13 @@ def clean_html(soup: BeautifulSoup, selectors_to_remove: List[str] = None):
     """
     if selectors_to_remove is None:
         selectors_to_remove = ['script', 'style', 'noscript', 'iframe', 'svg']
+    if not selectors_to_remove:
+        return
         
-    for selector in selectors_to_remove:
-        for element in soup.select(selector):
+    # One tree walk for the whole union; matches come out in document order,
+    # so descendants of an already removed element are skipped
+    for element in soup.select(', '.join(selectors_to_remove)):
+        if not element.decomposed:
             element.decompose()
             
     # Remove comments
@@ -1,31 +1,111 @@
+import heapq
 import sqlite3
-import json
 import logging
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 
+import orjson
+
+# WAL lets the dashboard read while the crawler writes; with it, NORMAL
+# synchronous only fsyncs at checkpoints instead of on every commit.
+# journal_mode persists in the DB file, the rest are per connection.
+WRITE_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA wal_autocheckpoint = 1000",
+    "PRAGMA busy_timeout = 5000",
+]
+
+# Rows per multi-row INSERT; 512 rows of up to 6 columns stays well
+# under SQLite's 32766 bound-parameter limit
+INSERT_CHUNK_ROWS = 512
+
+# sqlite3 keeps compiled statements in an LRU keyed by SQL text. Every
+# query here is a fixed string, and multi-row INSERTs only come in
+# power-of-two row counts, so all of them fit and none is re-prepared.
+STATEMENT_CACHE_SIZE = 256
+
+# Queue rows as heap entries, smallest first in get_next_url's order:
+# priority DESC, added_at ASC, rowid ASC
+QUEUE_HEAP_COLUMNS = "-COALESCE(priority, 0), COALESCE(added_at, ''), rowid, url, depth, parent_url"
+
+EMPTY_JSON_OBJECT = '{}'
+
+def _dump_json(value: Any) -> str:
+    # Empty dicts (failed or skipped documents) don't need the serializer
+    if value == {}:
+        return EMPTY_JSON_OBJECT
+    # JSON columns must be bound as text: json_extract() rejects BLOBs
+    return orjson.dumps(value).decode('utf-8')
+
+def _load_json(raw: Optional[str]) -> Any:
+    if not raw or raw == EMPTY_JSON_OBJECT:
+        return {}
+    return orjson.loads(raw)
+
 class SqliteStore:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, immutable: bool = False):
         self.db_path = db_path
         self.conn = None
         self.cursor = None
-        self._init_db()
+        self._tx_depth = 0
+        # Pending queue rows (QUEUE_HEAP_COLUMNS). Loaded on the first
+        # get_next_url, dropped on rollback and reloaded on the next pop.
+        self._queue_heap = None
+        if immutable:
+            self._open_immutable()
+        else:
+            self._init_db()
 
     def _init_db(self):
         """Initialize the database connection and schema."""
         # Ensure the directory exists
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        self.conn = sqlite3.connect(self.db_path)
+        # isolation_level=None: the driver no longer opens a transaction
+        # before each INSERT/UPDATE. Standalone writes commit on their own,
+        # batches go through transaction(). No cache=shared: it makes
+        # connections in one process contend on table locks (SQLITE_BUSY).
+        self.conn = sqlite3.connect(
+            f"{Path(self.db_path).resolve().as_uri()}?mode=rwc", uri=True,
+            isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+        )
         self.conn.row_factory = sqlite3.Row
         self.cursor = self.conn.cursor()
         
         # Enable foreign keys
         self.cursor.execute("PRAGMA foreign_keys = ON;")
+        for pragma in WRITE_PRAGMAS:
+            self.cursor.execute(pragma)
         
         self._create_tables()
 
+    def _open_immutable(self):
+        """
+        Open for offline analysis (exports of a finished crawl): read-only,
+        and with immutable=1 SQLite takes no locks and never checks the
+        file for changes. The schema is left as it is.
+        """
+        path = Path(self.db_path).resolve()
+        wal = path.with_name(path.name + '-wal')
+        mode = 'ro&immutable=1'
+        if wal.exists() and wal.stat().st_size:
+            # Immutable readers ignore the WAL, so pages not yet checkpointed
+            # (a crawl still running, or one that was killed) would be missed
+            logging.warning(f"{wal} is not empty; opening {path} without immutable=1")
+            mode = 'ro'
+        self.conn = sqlite3.connect(
+            f"{path.as_uri()}?mode={mode}", uri=True,
+            isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.cursor = self.conn.cursor()
+
     def _create_tables(self):
         """Create necessary tables if they don't exist."""
         
@@ -41,14 +121,27 @@ class SqliteStore:
                 local_artifact_paths TEXT, -- JSON
                 crawled_at TIMESTAMP,
                 error_message TEXT,
-                meta_tags TEXT -- JSON
+                meta_tags TEXT, -- JSON
+                is_faq_page INTEGER GENERATED ALWAYS AS (json_extract(meta_tags, '$.is_faq_page')) VIRTUAL
             )
         """)
+        # Databases created before the generated column existed need it added in place
+        self._ensure_column(
+            'documents', 'is_faq_page',
+            "INTEGER GENERATED ALWAYS AS (json_extract(meta_tags, '$.is_faq_page')) VIRTUAL"
+        )
+        # Partial index so FAQ page lookups never touch non-FAQ documents
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_documents_faq_pages
+            ON documents(url) WHERE is_faq_page = 1
+        """)
         
-        # FAQ Items table
+        # FAQ Items table. Plain INTEGER PRIMARY KEY (no AUTOINCREMENT):
+        # ids are still assigned in order, without a sqlite_sequence update
+        # per insert. Same for link_edges.
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS faq_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 document_url TEXT,
                 question_text TEXT,
                 answer_text TEXT,
@@ -62,7 +155,7 @@ class SqliteStore:
         # Link Edges table
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS link_edges (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 parent_url TEXT,
                 child_url TEXT,
                 anchor_text TEXT,
@@ -111,36 +204,227 @@ class SqliteStore:
             )
         """)
         
-        # Crawl State (Key-Value store for global metadata)
+        # Crawl State (Key-Value store for global metadata); clustered on
+        # the key, so there is no separate rowid B-tree to maintain
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS crawl_state (
                 key TEXT PRIMARY KEY,
                 value TEXT
+            ) WITHOUT ROWID
+        """)
+        
+        # FTS5 Virtual Table for searchable extracted text.
+        # The text is stored once, in documents_text; documents_fts is an
+        # external-content index over it, kept in sync by triggers.
+        # Re-crawls update a URL's row in place instead of adding another.
+        self.cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'documents_fts'")
+        row = self.cursor.fetchone()
+        standalone_fts = row is not None and 'documents_text' not in row[0]
+        # Migrating moves the text and rebuilds the index in one transaction
+        with self.transaction() if standalone_fts else nullcontext():
+            self._create_documents_fts(standalone_fts)
+        self.cursor.executescript("""
+            CREATE TRIGGER IF NOT EXISTS documents_text_ai AFTER INSERT ON documents_text BEGIN
+                INSERT INTO documents_fts (rowid, url, title, content)
+                VALUES (new.id, new.url, new.title, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_text_ad AFTER DELETE ON documents_text BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, url, title, content)
+                VALUES ('delete', old.id, old.url, old.title, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_text_au AFTER UPDATE ON documents_text BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, url, title, content)
+                VALUES ('delete', old.id, old.url, old.title, old.content);
+                INSERT INTO documents_fts (rowid, url, title, content)
+                VALUES (new.id, new.url, new.title, new.content);
+            END;
+        """)
+        # Trigram FTS5 index over FAQ text so substring search doesn't scan faq_items.
+        # External content: rows live in faq_items only, kept in sync by triggers.
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'faq_fts'")
+        faq_fts_exists = self.cursor.fetchone() is not None
+        self.cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS faq_fts USING fts5(
+                question_text,
+                answer_text,
+                content='faq_items',
+                content_rowid='id',
+                tokenize='trigram'
             )
         """)
+        self.cursor.executescript("""
+            CREATE TRIGGER IF NOT EXISTS faq_items_ai AFTER INSERT ON faq_items BEGIN
+                INSERT INTO faq_fts (rowid, question_text, answer_text)
+                VALUES (new.id, new.question_text, new.answer_text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS faq_items_ad AFTER DELETE ON faq_items BEGIN
+                INSERT INTO faq_fts (faq_fts, rowid, question_text, answer_text)
+                VALUES ('delete', old.id, old.question_text, old.answer_text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS faq_items_au AFTER UPDATE ON faq_items BEGIN
+                INSERT INTO faq_fts (faq_fts, rowid, question_text, answer_text)
+                VALUES ('delete', old.id, old.question_text, old.answer_text);
+                INSERT INTO faq_fts (rowid, question_text, answer_text)
+                VALUES (new.id, new.question_text, new.answer_text);
+            END;
+        """)
+        if not faq_fts_exists:
+            # Index FAQs stored before the FTS table existed
+            self.cursor.execute("INSERT INTO faq_fts (faq_fts) VALUES ('rebuild')")
         
-        # FTS5 Virtual Table for searchable extracted text
-        # Using separate table to avoid complexity with raw content updates if not needed frequently,
-        # but spec says "FTS5 table(s) for searchable extracted text".
-        # We'll index content from documents (if we stored full text there) or link it.
-        # Since we are storing raw artifacts on disk, we might want to store extracted text here for search.
+        # Indexes for the dashboard queries
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_status ON documents(status)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_link_edges_external_parent ON link_edges(is_external, parent_url)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_faq_items_document_url ON faq_items(document_url)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_link_edges_internal_child ON link_edges(child_url) WHERE is_external = 0")
+
+        # Queue: get_next_url reads the first entry of this partial index
+        # (pending rows only, already in pick order); counts scan idx_queue_status
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_queue_pending
+            ON crawl_queue(status, priority DESC, added_at ASC) WHERE status = 'pending'
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_queue_status ON crawl_queue(status)")
+
+    def _create_documents_fts(self, standalone_fts: bool):
+        """Create documents_text and its FTS index, moving rows out of a standalone documents_fts."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS documents_text (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE,
+                title TEXT,
+                content TEXT
+            )
+        """)
+        if standalone_fts:
+            # Older databases kept the text in documents_fts itself, possibly
+            # several rows per URL; move the newest of each over
+            self.cursor.execute("""
+                INSERT INTO documents_text (url, title, content)
+                SELECT url, title, content FROM documents_fts
+                WHERE rowid IN (SELECT MAX(rowid) FROM documents_fts GROUP BY url)
+                ORDER BY rowid
+            """)
+            self.cursor.execute("DROP TABLE documents_fts")
         self.cursor.execute("""
             CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
                 url UNINDEXED,
                 title,
-                content
+                content,
+                content='documents_text',
+                content_rowid='id'
             )
         """)
+        if standalone_fts:
+            # Same transaction as the move, so the index is never left empty
+            self.cursor.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
 
-        self.conn.commit()
+    def _ensure_column(self, table: str, column: str, definition: str):
+        """Add a column to an existing table if it is missing."""
+        # table_xinfo (unlike table_info) also lists generated columns
+        self.cursor.execute(f"PRAGMA table_xinfo({table})")
+        if column not in {row['name'] for row in self.cursor.fetchall()}:
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
     def close(self):
         if self.conn:
             self.conn.close()
 
+    def optimize_fts(self):
+        """
+        Merge each full-text index into a single segment. Crawl-time inserts
+        leave many small segments behind; one merge at the end keeps MATCH
+        queries from having to consult all of them.
+        """
+        self.cursor.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+        self.cursor.execute("INSERT INTO faq_fts (faq_fts) VALUES ('optimize')")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes into a single commit. Nested blocks run as
+        savepoints, so a failing inner block only rolls back its own writes.
+        """
+        if self._tx_depth:
+            name = f"sp_{self._tx_depth}"
+            self.cursor.execute(f"SAVEPOINT {name}")
+            self._tx_depth += 1
+            try:
+                yield
+            except BaseException:
+                self.cursor.execute(f"ROLLBACK TO {name}")
+                self._queue_heap = None
+                raise
+            finally:
+                self._tx_depth -= 1
+                self.cursor.execute(f"RELEASE {name}")
+            return
+
+        # Explicit BEGIN so savepoints nest inside it rather than opening
+        # (and, on RELEASE, committing) a transaction of their own.
+        # IMMEDIATE takes the write lock up front: a deferred transaction
+        # that reads first can fail with SQLITE_BUSY when it later upgrades.
+        if not self.conn.in_transaction:
+            self.cursor.execute("BEGIN IMMEDIATE")
+        self._tx_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._tx_depth -= 1
+            self.conn.rollback()
+            self._queue_heap = None
+            raise
+        self._tx_depth -= 1
+        self.conn.commit()
+
+    @contextmanager
+    def _atomic(self):
+        """
+        For writers that issue several statements: join the open
+        transaction if there is one, otherwise run in a transaction of
+        their own. Outside a transaction every statement commits by itself.
+        """
+        if self._tx_depth:
+            yield
+        else:
+            with self.transaction():
+                yield
+
+    def _insert_rows(self, statement: str, rows: List[tuple], returning: str = '') -> List[tuple]:
+        """
+        Run `statement` (an INSERT ending in VALUES) with multi-row VALUES
+        lists of INSERT_CHUNK_ROWS rows, the remainder split into
+        power-of-two chunks. Few distinct statement shapes means each
+        stays in the statement cache instead of being compiled per batch.
+        With `returning` (a RETURNING column list) the inserted rows'
+        values are returned.
+        """
+        inserted = []
+        if not rows:
+            return inserted
+        group = '(' + ', '.join('?' * len(rows[0])) + ')'
+        suffix = f" RETURNING {returning}" if returning else ''
+        start = 0
+        with self._atomic():
+            while start < len(rows):
+                size = min(INSERT_CHUNK_ROWS, 1 << ((len(rows) - start).bit_length() - 1))
+                chunk = rows[start:start + size]
+                self.cursor.execute(
+                    statement + ', '.join([group] * size) + suffix,
+                    [value for row in chunk for value in row]
+                )
+                if returning:
+                    inserted.extend(self.cursor.fetchall())
+                start += size
+        return inserted
+
     # --- Documents ---
-    def upsert_document(self, doc_data: Dict[str, Any]):
-        """Insert or update a document."""
+    def upsert_document(self, doc_data: Dict[str, Any], returning: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Insert or update a document. With returning=True the stored row is
+        returned, as get_document would give it, read back by the write
+        itself (RETURNING) rather than a second lookup.
+        """
         query = """
             INSERT INTO documents (
                 url, canonical_url, status, depth_from_seed, url_path, 
@@ -157,39 +441,51 @@ class SqliteStore:
                 error_message=excluded.error_message,
                 meta_tags=excluded.meta_tags
         """
-        self.cursor.execute(query, (
-            doc_data['url'],
-            doc_data.get('canonical_url'),
-            doc_data.get('status'),
-            doc_data.get('depth_from_seed'),
-            doc_data.get('url_path'),
-            doc_data.get('content_type'),
-            json.dumps(doc_data.get('local_artifact_paths', {})),
-            doc_data.get('crawled_at', datetime.now().isoformat()),
-            doc_data.get('error_message'),
-            json.dumps(doc_data.get('meta_tags', {}))
-        ))
-        self.conn.commit()
-        
-        # Update FTS
-        content = doc_data.get('extracted_text', '')
-        if content:
-             self.cursor.execute("""
-                INSERT INTO documents_fts (url, title, content) 
-                VALUES (?, ?, ?)
-            """, (doc_data['url'], doc_data.get('title', ''), content))
-             self.conn.commit()
+        if returning:
+            query += " RETURNING *"
+        # Document row and its text commit together
+        with self._atomic():
+            self.cursor.execute(query, (
+                doc_data['url'],
+                doc_data.get('canonical_url'),
+                doc_data.get('status'),
+                doc_data.get('depth_from_seed'),
+                doc_data.get('url_path'),
+                doc_data.get('content_type'),
+                _dump_json(doc_data.get('local_artifact_paths', {})),
+                doc_data.get('crawled_at', datetime.now().isoformat()),
+                doc_data.get('error_message'),
+                _dump_json(doc_data.get('meta_tags', {}))
+            ))
+            # fetchall steps the statement to completion before the next write
+            row = self.cursor.fetchall()[0] if returning else None
+
+            # Update FTS (documents_text triggers keep documents_fts in sync)
+            content = doc_data.get('extracted_text', '')
+            if content:
+                self.cursor.execute("""
+                    INSERT INTO documents_text (url, title, content)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title=excluded.title,
+                        content=excluded.content
+                """, (doc_data['url'], doc_data.get('title', ''), content))
+        return self._document_dict(row) if row else None
 
     def get_document(self, url: str) -> Optional[Dict[str, Any]]:
         self.cursor.execute("SELECT * FROM documents WHERE url = ?", (url,))
         row = self.cursor.fetchone()
         if row:
-            d = dict(row)
-            d['local_artifact_paths'] = json.loads(d['local_artifact_paths']) if d['local_artifact_paths'] else {}
-            d['meta_tags'] = json.loads(d['meta_tags']) if d['meta_tags'] else {}
-            return d
+            return self._document_dict(row)
         return None
 
+    @staticmethod
+    def _document_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        d = dict(row)
+        d['local_artifact_paths'] = _load_json(d['local_artifact_paths'])
+        d['meta_tags'] = _load_json(d['meta_tags'])
+        return d
+
     # --- FAQ Items ---
     def add_faq_items(self, items: List[Dict[str, Any]]):
         if not items:
@@ -198,16 +494,14 @@ class SqliteStore:
             INSERT INTO faq_items (
                 document_url, question_text, answer_text, answer_raw_html, 
                 answer_mode, link_depth_to_answer
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        """
+            ) VALUES """
         data = [
             (
                 i['document_url'], i['question_text'], i['answer_text'], 
                 i.get('answer_raw_html'), i.get('answer_mode'), i.get('link_depth_to_answer')
             ) for i in items
         ]
-        self.cursor.executemany(query, data)
-        self.conn.commit()
+        self._insert_rows(query, data)
 
     # --- Link Edges ---
     def add_link_edges(self, edges: List[Dict[str, Any]]):
@@ -216,19 +510,18 @@ class SqliteStore:
         query = """
             INSERT INTO link_edges (
                 parent_url, child_url, anchor_text, is_external, canonical_child_url
-            ) VALUES (?, ?, ?, ?, ?)
-        """
+            ) VALUES """
         data = [
             (
                 e['parent_url'], e['child_url'], e.get('anchor_text'), 
                 e.get('is_external', False), e.get('canonical_child_url')
             ) for e in edges
         ]
-        self.cursor.executemany(query, data)
-        self.conn.commit()
+        self._insert_rows(query, data)
 
     # --- Assets ---
-    def add_asset(self, asset_data: Dict[str, Any]):
+    def add_asset(self, asset_data: Dict[str, Any], returning: bool = False) -> Optional[Dict[str, Any]]:
+        """Insert or update an asset; returning=True gives back the stored row."""
         query = """
             INSERT INTO assets (asset_url, source_page_url, asset_type, local_path)
             VALUES (?, ?, ?, ?)
@@ -237,13 +530,17 @@ class SqliteStore:
                 asset_type=excluded.asset_type,
                 local_path=excluded.local_path
         """
+        if returning:
+            query += " RETURNING *"
         self.cursor.execute(query, (
             asset_data['asset_url'],
             asset_data['source_page_url'],
             asset_data['asset_type'],
             asset_data['local_path']
         ))
-        self.conn.commit()
+        if returning:
+            return dict(self.cursor.fetchall()[0])
+        return None
 
     # --- External Registries ---
     def register_external_url(self, url: str):
@@ -251,61 +548,138 @@ class SqliteStore:
             INSERT OR IGNORE INTO external_links_global (url, first_seen_at)
             VALUES (?, ?)
         """, (url, datetime.now().isoformat()))
-        self.conn.commit()
 
     def register_external_domain(self, domain: str):
         self.cursor.execute("""
             INSERT OR IGNORE INTO external_domains_global (domain, first_seen_at)
             VALUES (?, ?)
         """, (domain, datetime.now().isoformat()))
-        self.conn.commit()
+
+    def bulk_register_external(self, urls: List[str], domains: List[str]):
+        """Register many external URLs and domains in one pass."""
+        now = datetime.now().isoformat()
+        with self._atomic():
+            self._insert_rows(
+                "INSERT OR IGNORE INTO external_links_global (url, first_seen_at) VALUES ",
+                [(url, now) for url in urls]
+            )
+            self._insert_rows(
+                "INSERT OR IGNORE INTO external_domains_global (domain, first_seen_at) VALUES ",
+                [(domain, now) for domain in domains]
+            )
 
     # --- Queue Management ---
+    # crawl_queue is the durable queue (resume, dashboard counts), but
+    # get_next_url pops from an in-memory heap of its pending rows. Once
+    # the heap is loaded, inserts push the rows RETURNING says they added.
+    def _push_queued(self, rows: List[tuple]):
+        for row in rows:
+            heapq.heappush(self._queue_heap, tuple(row))
+
     def queue_url(self, url: str, depth: int, parent_url: Optional[str] = None, priority: int = 0):
         """Add a URL to the crawl queue if it doesn't exist."""
+        query = """
+            INSERT OR IGNORE INTO crawl_queue (url, depth, parent_url, status, added_at, priority)
+            VALUES (?, ?, ?, 'pending', ?, ?)
+        """
+        if self._queue_heap is not None:
+            query += f" RETURNING {QUEUE_HEAP_COLUMNS}"
         try:
-            self.cursor.execute("""
-                INSERT OR IGNORE INTO crawl_queue (url, depth, parent_url, status, added_at, priority)
-                VALUES (?, ?, ?, 'pending', ?, ?)
-            """, (url, depth, parent_url, datetime.now().isoformat(), priority))
-            self.conn.commit()
+            self.cursor.execute(query, (url, depth, parent_url, datetime.now().isoformat(), priority))
+            if self._queue_heap is not None:
+                self._push_queued(self.cursor.fetchall())
         except sqlite3.Error as e:
             logging.error(f"Error queueing URL {url}: {e}")
 
+    def bulk_queue_urls(self, rows: List[tuple], priority: int = 0):
+        """Queue many (url, depth, parent_url) rows; already queued URLs are ignored."""
+        if not rows:
+            return
+        # One timestamp per batch; get_next_url breaks ties by rowid, which
+        # follows the order rows were inserted (discovery order)
+        now = datetime.now().isoformat()
+        data = [
+            (url, depth, parent_url, 'pending', now, priority)
+            for url, depth, parent_url in rows
+        ]
+        heap_loaded = self._queue_heap is not None
+        try:
+            inserted = self._insert_rows(
+                "INSERT OR IGNORE INTO crawl_queue (url, depth, parent_url, status, added_at, priority) VALUES ",
+                data,
+                returning=QUEUE_HEAP_COLUMNS if heap_loaded else ''
+            )
+            if heap_loaded:
+                self._push_queued(inserted)
+        except sqlite3.Error as e:
+            # Re-raised so the caller's transaction rolls back with it
+            logging.error(f"Error queueing {len(rows)} URLs: {e}")
+            raise
+
     def get_next_url(self) -> Optional[Dict[str, Any]]:
-        """Get the next pending URL from the queue, ordered by priority and time."""
-        # Simple FIFO with priority
-        self.cursor.execute("""
-            SELECT * FROM crawl_queue 
-            WHERE status = 'pending' 
-            ORDER BY priority DESC, added_at ASC 
-            LIMIT 1
-        """)
-        row = self.cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+        """
+        Pop the next pending URL, ordered by priority, then time, then
+        insertion order. A popped URL is not handed out again in this
+        process; the caller records progress through update_queue_status.
+        Rows left 'processing' by a crawl that stopped are put back with
+        requeue_processing().
+        """
+        if self._queue_heap is None:
+            # One scan of the pending rows (ORDER BY rowid is a cheap B-tree
+            # walk and leaves the list nearly in heap order)
+            self.cursor.execute(f"""
+                SELECT {QUEUE_HEAP_COLUMNS} FROM crawl_queue
+                WHERE status = 'pending'
+                ORDER BY rowid
+            """)
+            self._queue_heap = [tuple(row) for row in self.cursor.fetchall()]
+            heapq.heapify(self._queue_heap)
+        if not self._queue_heap:
+            return None
+        neg_priority, added_at, _, url, depth, parent_url = heapq.heappop(self._queue_heap)
+        return {
+            'url': url,
+            'depth': depth,
+            'parent_url': parent_url,
+            'status': 'pending',
+            'added_at': added_at,
+            'priority': -neg_priority,
+        }
+
+    def requeue_processing(self) -> int:
+        """
+        Return rows left 'processing' (in flight when a crawl was killed)
+        to 'pending'; returns how many were reset.
+        """
+        self.cursor.execute("UPDATE crawl_queue SET status = 'pending' WHERE status = 'processing'")
+        if self.cursor.rowcount:
+            self._queue_heap = None
+        return self.cursor.rowcount
 
     def update_queue_status(self, url: str, status: str):
         self.cursor.execute("""
             UPDATE crawl_queue SET status = ? WHERE url = ?
         """, (status, url))
-        self.conn.commit()
+        if status == 'pending':
+            # Re-queued rows are not in the heap; reload it on the next pop
+            self._queue_heap = None
 
     def is_url_visited_or_queued(self, url: str) -> bool:
         """Check if URL is already known (in queue or documents)."""
-        # Check documents (visited)
-        self.cursor.execute("SELECT 1 FROM documents WHERE url = ?", (url,))
-        if self.cursor.fetchone():
-            return True
-        
-        # Check queue
-        self.cursor.execute("SELECT 1 FROM crawl_queue WHERE url = ?", (url,))
-        if self.cursor.fetchone():
-            return True
-            
-        return False
+        # Documents (visited) first; LIMIT 1 stops before the queue lookup on a hit
+        self.cursor.execute("""
+            SELECT 1 FROM documents WHERE url = ?
+            UNION ALL
+            SELECT 1 FROM crawl_queue WHERE url = ?
+            LIMIT 1
+        """, (url, url))
+        return self.cursor.fetchone() is not None
     
+    def load_seen_set(self) -> set:
+        """All URLs already queued or visited, for in-memory dedup."""
+        self.cursor.execute("SELECT url FROM crawl_queue UNION SELECT url FROM documents")
+        return {row[0] for row in self.cursor.fetchall()}
+
     def get_queue_counts(self) -> Dict[str, int]:
         self.cursor.execute("SELECT status, COUNT(*) FROM crawl_queue GROUP BY status")
         return dict(self.cursor.fetchall())
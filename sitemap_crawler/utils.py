@@ -3,12 +3,17 @@ import os
 from pathlib import Path
 from typing import Optional
 
+def url_hash(url: str) -> str:
+    """
+    Hex digest used as the stem of every artifact filename for the URL.
+    """
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
 def generate_deterministic_filename(url: str, extension: str) -> str:
     """
     Generates a deterministic filename based on the URL hash.
     """
-    hash_object = hashlib.sha256(url.encode('utf-8'))
-    hex_dig = hash_object.hexdigest()
+    hex_dig = url_hash(url)
     if extension.startswith('.'):
         return f"{hex_dig}{extension}"
     return f"{hex_dig}.{extension}"
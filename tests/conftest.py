@@ -1,8 +1,11 @@
 import pytest
 import os
 import tempfile
+from bs4 import BeautifulSoup
 from sitemap_crawler.storage.sqlite_store import SqliteStore
 
+OUTPUT_KINDS = ['html', 'md', 'pdf', 'pdf_text', 'video', 'transcripts', 'json']
+
 @pytest.fixture
 def temp_db_path():
     fd, path = tempfile.mkstemp(suffix='.sqlite')
@@ -16,8 +19,17 @@ def store(temp_db_path):
     yield s
     s.close()
 
+@pytest.fixture(scope='session')
+def base_dirs(tmp_path_factory):
+    # Artifact names are derived from the URL, so tests can share directories
+    return {kind: str(tmp_path_factory.mktemp(kind)) for kind in OUTPUT_KINDS}
+
+@pytest.fixture
+def parse_html():
+    return lambda html: BeautifulSoup(html, 'lxml')
+
 @pytest.fixture
-def config(temp_db_path):
+def config(temp_db_path, base_dirs):
     return {
         'seed_urls': ['https://www.example.com/sitemap.html'],
         'allowed_domains': ['example.com'],
@@ -28,15 +40,7 @@ def config(temp_db_path):
         'rate_limit': {'delay': 0},
         'timeouts': {'connect': 1, 'read': 1},
         'retries': {'total': 0, 'backoff_factor': 0},
-        'output_directories': {
-            'html': tempfile.mkdtemp(),
-            'md': tempfile.mkdtemp(),
-            'pdf': tempfile.mkdtemp(),
-            'pdf_text': tempfile.mkdtemp(),
-            'video': tempfile.mkdtemp(),
-            'transcripts': tempfile.mkdtemp(),
-            'json': tempfile.mkdtemp()
-        },
+        'output_directories': dict(base_dirs),
         'db_path': temp_db_path,
         'excluded_sitemap_sections': ['Accounts', 'Payments'],
         'content_type_allowlist': ['text/html']
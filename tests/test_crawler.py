@@ -1,14 +1,19 @@
+import sqlite3
+import threading
+import time
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 from sitemap_crawler.crawler.engine import Crawler
+from sitemap_crawler.crawler.fetcher import Fetcher
 from sitemap_crawler.crawler.robots import RobotsParser
+from sitemap_crawler.crawler.canonicalization import canonicalize_url
 from sitemap_crawler.storage.sqlite_store import SqliteStore
 
 @pytest.fixture
 def mock_fetcher():
     with patch('sitemap_crawler.crawler.engine.Fetcher') as MockFetcher:
         fetcher_instance = MockFetcher.return_value
-        fetcher_instance.fetch.return_value = (MagicMock(status_code=200, text="<html></html>", headers={'Content-Type': 'text/html'}), None)
+        fetcher_instance.fetch.return_value = (MagicMock(status_code=200, text="<html></html>", content=b"<html></html>", headers={'Content-Type': 'text/html'}), None)
         yield fetcher_instance
 
 @pytest.fixture
@@ -83,13 +88,14 @@ def test_depth_enforcement_general(config, store, mock_fetcher, mock_robots):
     # It should NOT queue children at depth 4
     
     # Mock response with links
-    mock_response = MagicMock(status_code=200, text="""
+    html = """
         <html>
             <body>
                 <a href="https://example.com/depth4">Link</a>
             </body>
         </html>
-    """, headers={'Content-Type': 'text/html'})
+    """
+    mock_response = MagicMock(status_code=200, text=html, content=html.encode(), headers={'Content-Type': 'text/html'})
     mock_fetcher.fetch.return_value = (mock_response, None)
     
     crawler.process_url("https://example.com/depth3", 3, None)
@@ -106,14 +112,15 @@ def test_depth_enforcement_faq_context(config, store, mock_fetcher, mock_robots)
     crawler = Crawler(config)
     
     # Process a page at depth 3 that HAS FAQs
-    mock_response = MagicMock(status_code=200, text="""
+    html = """
         <html>
             <body>
                 <details><summary>Q</summary>A</details>
                 <a href="https://example.com/depth4">Link</a>
             </body>
         </html>
-    """, headers={'Content-Type': 'text/html'})
+    """
+    mock_response = MagicMock(status_code=200, text=html, content=html.encode(), headers={'Content-Type': 'text/html'})
     mock_fetcher.fetch.return_value = (mock_response, None)
     
     crawler.process_url("https://example.com/depth3_faq", 3, None)
@@ -135,3 +142,113 @@ def test_resumability(config, store):
     item = store.get_next_url()
     assert item['url'] in ["https://example.com/pending1", "https://example.com/pending2"]
 
+def test_interrupted_urls_are_requeued(config, store):
+    store.queue_url("https://example.com/in-flight", 1)
+    assert store.get_next_url()['url'] == "https://example.com/in-flight"
+    store.update_queue_status("https://example.com/in-flight", 'processing')
+    # Crawl killed here; a new crawler picks the URL up again
+    crawler = Crawler(config)
+    assert crawler.store.get_next_url()['url'] == "https://example.com/in-flight"
+
+def test_run_loop_drains_queue(config, store, mock_fetcher, mock_robots):
+    config['concurrency'] = {'workers': 2, 'per_host': 1}
+    crawler = Crawler(config)
+    for i in range(5):
+        store.queue_url(f"https://example.com/page{i}", 1)
+
+    crawler.run_loop()
+
+    assert store.get_queue_counts() == {'completed': 5}
+    assert mock_fetcher.fetch.call_count == 5
+    assert store.get_document("https://example.com/page4")['status'] == 'CRAWLED'
+
+def test_rolled_back_top_up_submits_no_fetches(config, store, mock_fetcher, mock_robots):
+    crawler = Crawler(config)
+    store.queue_url("https://example.com/first", 1)
+    store.queue_url("https://example.com/second", 1)
+
+    update_status = SqliteStore.update_queue_status
+    marked = []
+    def fail_second_mark(self, url, status):
+        if marked:
+            raise sqlite3.OperationalError("database is locked")
+        marked.append(url)
+        update_status(self, url, status)
+    with patch.object(SqliteStore, 'update_queue_status', fail_second_mark):
+        with pytest.raises(sqlite3.OperationalError):
+            crawler.run_loop()
+
+    # Both URLs are back to pending, and neither was fetched meanwhile
+    mock_fetcher.fetch.assert_not_called()
+    assert store.get_queue_counts() == {'pending': 2}
+
+def test_rolled_back_children_stay_unseen(config, store, mock_fetcher, mock_robots):
+    html = '<html><body><a href="https://example.com/child">Child</a></body></html>'
+    mock_fetcher.fetch.return_value = (
+        MagicMock(status_code=200, text=html, content=html.encode(), headers={'Content-Type': 'text/html'}), None
+    )
+    crawler = Crawler(config)
+    child = canonicalize_url("https://example.com/child")
+    store.queue_url("https://example.com/parent", 1)
+
+    # The page's savepoint rolls back after its children were inserted
+    update_status = SqliteStore.update_queue_status
+    def fail_completion(self, url, status):
+        if status == 'completed':
+            raise sqlite3.OperationalError("disk I/O error")
+        update_status(self, url, status)
+    with patch.object(SqliteStore, 'update_queue_status', fail_completion):
+        crawler.run_loop()
+    assert child not in crawler.seen
+    assert not store.is_url_visited_or_queued(child)
+
+    # A later page linking the same child still queues it
+    crawler.process_url("https://example.com/other", 1, None)
+    assert child in crawler.seen
+    assert store.is_url_visited_or_queued(child)
+
+def test_disallowed_type_body_is_not_read(config, store, mock_fetcher, mock_robots):
+    crawler = Crawler(config)
+    response = MagicMock(status_code=200, headers={'Content-Type': 'video/mp4'})
+    type(response).content = PropertyMock(side_effect=AssertionError("body read"))
+    mock_fetcher.fetch.return_value = (response, None)
+    store.queue_url("https://example.com/clip.mp4", 1)
+
+    crawler.run_loop()
+
+    response.close.assert_called_once()
+    assert store.get_document("https://example.com/clip.mp4")['status'] == 'UNSUPPORTED_TYPE'
+
+def test_robots_parser_reuses_host_lookup():
+    robots = RobotsParser("TestBot")
+    with patch('urllib.robotparser.RobotFileParser.read', autospec=True) as mock_read:
+        def read(rp):
+            rp.parse(["User-agent: *", "Disallow: /private"])
+        mock_read.side_effect = read
+
+        assert robots.can_fetch("https://example.com/page")
+        assert not robots.can_fetch("https://example.com/private/x")
+        assert mock_read.call_count == 1
+
+        # A longer host sharing the prefix is a different domain
+        assert robots.can_fetch("https://example.com.evil.org/page")
+        assert mock_read.call_count == 2
+        assert not robots.can_fetch("https://EXAMPLE.com/private")
+        assert mock_read.call_count == 2
+
+def test_rate_limit_is_paced_per_host():
+    fetcher = Fetcher({'rate_limit': {'delay': 0.3}, 'retries': {'total': 0}})
+    fetcher.session.get = MagicMock()
+    def crawl_host(host):
+        for i in range(2):
+            fetcher.fetch(f"https://{host}/page{i}")
+    threads = [threading.Thread(target=crawl_host, args=(host,)) for host in ('a.example.com', 'b.example.com')]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    # Each host waits its own delay once; a shared limiter would need three
+    assert 0.3 <= elapsed < 0.6
+    assert fetcher.session.get.call_count == 4
@@ -1,8 +1,7 @@
-from bs4 import BeautifulSoup
 from sitemap_crawler.extractors.faq_extractor import FAQExtractor
 from sitemap_crawler.extractors.document_extractor import DocumentExtractor
 
-def test_faq_extraction_simple():
+def test_faq_extraction_simple(parse_html):
     html = """
     <html>
         <body>
@@ -16,7 +15,7 @@ def test_faq_extraction_simple():
     </html>
     """
     extractor = FAQExtractor()
-    soup = BeautifulSoup(html, 'lxml')
+    soup = parse_html(html)
     faqs = extractor.extract(soup, "http://test.com")
     
     assert len(faqs) == 1
@@ -24,7 +23,7 @@ def test_faq_extraction_simple():
     assert "Example Financial Services" in faqs[0]['answer_text']
     assert faqs[0]['answer_mode'] == "DIRECT_TEXT"
 
-def test_faq_extraction_with_link():
+def test_faq_extraction_with_link(parse_html):
     html = """
     <html>
         <body>
@@ -36,14 +35,14 @@ def test_faq_extraction_with_link():
     </html>
     """
     extractor = FAQExtractor()
-    soup = BeautifulSoup(html, 'lxml')
+    soup = parse_html(html)
     faqs = extractor.extract(soup, "http://test.com")
     
     assert len(faqs) == 1
     assert faqs[0]['question_text'] == "How to login?"
     assert faqs[0]['answer_mode'] == "PORTAL_REDIRECT"
 
-def test_faq_extraction_portal_mode():
+def test_faq_extraction_portal_mode(parse_html):
     html = """
     <html>
         <body>
@@ -55,11 +54,11 @@ def test_faq_extraction_portal_mode():
     </html>
     """
     extractor = FAQExtractor()
-    soup = BeautifulSoup(html, 'lxml')
+    soup = parse_html(html)
     faqs = extractor.extract(soup, "http://test.com")
     assert faqs[0]['answer_mode'] == "PORTAL_REDIRECT"
 
-def test_faq_extraction_custom_structure():
+def test_faq_extraction_custom_structure(parse_html):
     html = """
     <html>
         <body>
@@ -73,7 +72,7 @@ def test_faq_extraction_custom_structure():
     </html>
     """
     extractor = FAQExtractor()
-    soup = BeautifulSoup(html, 'lxml')
+    soup = parse_html(html)
     faqs = extractor.extract(soup, "http://test.com")
     
     assert len(faqs) == 1
@@ -0,0 +1,166 @@
+import sqlite3
+import pytest
+from sitemap_crawler.storage.sqlite_store import SqliteStore
+
+def test_is_faq_page_generated_column(store):
+    store.upsert_document({'url': 'https://example.com/faq', 'meta_tags': {'is_faq_page': True}})
+    store.upsert_document({'url': 'https://example.com/about', 'meta_tags': {'is_faq_page': False}})
+    
+    rows = store.conn.execute("SELECT url FROM documents WHERE is_faq_page = 1").fetchall()
+    assert [row['url'] for row in rows] == ['https://example.com/faq']
+
+def test_faq_fts_tracks_faq_items(store):
+    store.upsert_document({'url': 'https://example.com/faq'})
+    store.add_faq_items([
+        {'document_url': 'https://example.com/faq', 'question_text': 'How do I make a payment?', 'answer_text': 'Online.'},
+        {'document_url': 'https://example.com/faq', 'question_text': 'Where is my title?', 'answer_text': 'Mailed.'},
+    ])
+    
+    rows = store.conn.execute("SELECT rowid FROM faq_fts WHERE faq_fts MATCH '\"payment\"'").fetchall()
+    assert len(rows) == 1
+
+def test_transaction_commits_once_or_rolls_back(store, temp_db_path):
+    with store.transaction():
+        store.queue_url("https://example.com/a", 1)
+        store.queue_url("https://example.com/b", 1)
+        # Not visible to other connections until the block exits
+        other = SqliteStore(temp_db_path)
+        assert not other.is_url_visited_or_queued("https://example.com/a")
+    assert other.is_url_visited_or_queued("https://example.com/b")
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.queue_url("https://example.com/c", 1)
+            raise RuntimeError
+    assert not store.is_url_visited_or_queued("https://example.com/c")
+    other.close()
+
+def test_load_seen_set(store):
+    store.queue_url("https://example.com/queued", 1)
+    store.upsert_document({'url': 'https://example.com/visited'})
+    assert store.load_seen_set() == {"https://example.com/queued", "https://example.com/visited"}
+
+def test_multi_row_inserts_span_chunks(store):
+    store.upsert_document({'url': 'https://example.com/p'})
+    edges = [
+        {'parent_url': 'https://example.com/p', 'child_url': f'https://example.com/c{i}', 'is_external': False}
+        for i in range(1201)
+    ]
+    store.add_link_edges(edges)
+    rows = store.conn.execute("SELECT child_url FROM link_edges ORDER BY id").fetchall()
+    assert [r[0] for r in rows] == [e['child_url'] for e in edges]
+
+def test_nested_transaction_rolls_back_only_inner(store):
+    with store.transaction():
+        store.queue_url("https://example.com/outer", 1)
+        with pytest.raises(RuntimeError):
+            with store.transaction():
+                store.queue_url("https://example.com/inner", 1)
+                raise RuntimeError
+    assert store.is_url_visited_or_queued("https://example.com/outer")
+    assert not store.is_url_visited_or_queued("https://example.com/inner")
+
+def test_recrawl_replaces_document_fts_row(store):
+    store.upsert_document({'url': 'https://example.com/p', 'title': 'Old', 'extracted_text': 'first version'})
+    store.upsert_document({'url': 'https://example.com/p', 'title': 'New', 'extracted_text': 'second version'})
+    rows = store.conn.execute("SELECT title, content FROM documents_fts").fetchall()
+    assert [tuple(r) for r in rows] == [('New', 'second version')]
+    assert store.conn.execute("SELECT url FROM documents_fts WHERE documents_fts MATCH 'first'").fetchall() == []
+    assert len(store.conn.execute("SELECT url FROM documents_fts WHERE documents_fts MATCH 'second'").fetchall()) == 1
+
+def test_standalone_documents_fts_is_migrated(temp_db_path):
+    conn = sqlite3.connect(temp_db_path)
+    conn.execute("CREATE VIRTUAL TABLE documents_fts USING fts5(url UNINDEXED, title, content)")
+    conn.executemany("INSERT INTO documents_fts (url, title, content) VALUES (?, ?, ?)", [
+        ('https://example.com/a', 'A', 'stale copy'),
+        ('https://example.com/b', 'B', 'bravo text'),
+        ('https://example.com/a', 'A2', 'alpha text'),
+    ])
+    conn.commit()
+    conn.close()
+
+    store = SqliteStore(temp_db_path)
+    rows = store.conn.execute("SELECT url, title FROM documents_fts").fetchall()
+    assert sorted(tuple(r) for r in rows) == [('https://example.com/a', 'A2'), ('https://example.com/b', 'B')]
+    rows = store.conn.execute("SELECT url FROM documents_fts WHERE documents_fts MATCH 'alpha'").fetchall()
+    assert [r[0] for r in rows] == ['https://example.com/a']
+    store.close()
+
+def test_next_url_keeps_discovery_order_within_batch(store):
+    urls = [f"https://example.com/{name}" for name in ('z', 'a', 'm')]
+    store.bulk_queue_urls([(url, 1, None) for url in urls])
+    picked = []
+    while (item := store.get_next_url()) is not None:
+        picked.append(item['url'])
+        store.update_queue_status(item['url'], 'completed')
+    assert picked == urls
+
+def test_optimize_fts_keeps_matches(store):
+    for i in range(3):
+        with store.transaction():
+            store.upsert_document({'url': f'https://example.com/{i}', 'extracted_text': f'page number{i}'})
+    store.optimize_fts()
+    rows = store.conn.execute("SELECT url FROM documents_fts WHERE documents_fts MATCH 'page'").fetchall()
+    assert len(rows) == 3
+
+def test_immutable_store_reads_closed_database(store, temp_db_path):
+    store.upsert_document({'url': 'https://example.com/done'})
+    store.close()
+
+    snapshot = SqliteStore(temp_db_path, immutable=True)
+    assert snapshot.get_document('https://example.com/done')['url'] == 'https://example.com/done'
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot.conn.execute("DELETE FROM documents")
+    snapshot.close()
+
+def test_immutable_store_falls_back_while_wal_has_pages(store, temp_db_path):
+    # The writer is still open, so its commit sits in the WAL
+    store.upsert_document({'url': 'https://example.com/live'})
+    snapshot = SqliteStore(temp_db_path, immutable=True)
+    assert snapshot.get_document('https://example.com/live') is not None
+    snapshot.close()
+
+def test_upsert_document_writes_row_and_text_together(store):
+    store.conn.execute("""
+        CREATE TEMP TRIGGER fail_text BEFORE INSERT ON main.documents_text
+        BEGIN SELECT RAISE(ABORT, 'no text'); END
+    """)
+    with pytest.raises(sqlite3.IntegrityError):
+        store.upsert_document({'url': 'https://example.com/t', 'extracted_text': 'body'})
+    assert store.get_document('https://example.com/t') is None
+
+def test_upsert_returning_gives_stored_row(store):
+    store.upsert_document({'url': 'https://example.com/r', 'status': 'QUEUED'})
+    row = store.upsert_document(
+        {'url': 'https://example.com/r', 'status': 'CRAWLED', 'meta_tags': {'is_faq_page': True}},
+        returning=True
+    )
+    assert row == store.get_document('https://example.com/r')
+    assert row['status'] == 'CRAWLED' and row['meta_tags'] == {'is_faq_page': True}
+    assert store.upsert_document({'url': 'https://example.com/r'}) is None
+
+    asset = store.add_asset({
+        'asset_url': 'https://example.com/a.pdf', 'source_page_url': 'https://example.com/r',
+        'asset_type': 'pdf', 'local_path': '/tmp/a.pdf'
+    }, returning=True)
+    assert asset['asset_type'] == 'pdf' and asset['local_path'] == '/tmp/a.pdf'
+
+def test_next_url_heap_tracks_new_rows_and_rollbacks(store):
+    store.queue_url("https://example.com/low", 1)
+    assert store.get_next_url()['url'] == "https://example.com/low"
+    store.update_queue_status("https://example.com/low", 'completed')
+    # Queued after the heap was loaded: pushed only if actually inserted
+    store.bulk_queue_urls([("https://example.com/low", 1, None), ("https://example.com/next", 2, None)])
+    store.queue_url("https://example.com/seed", 0, priority=100)
+    assert store.get_next_url()['url'] == "https://example.com/seed"
+    item = store.get_next_url()
+    assert (item['url'], item['depth'], item['priority']) == ("https://example.com/next", 2, 0)
+    assert store.get_next_url() is None
+    store.update_queue_status("https://example.com/seed", 'completed')
+    store.update_queue_status("https://example.com/next", 'completed')
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.queue_url("https://example.com/gone", 1, priority=200)
+            raise RuntimeError
+    assert store.get_next_url() is None